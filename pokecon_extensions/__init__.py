@@ -1,3 +1,23 @@
-from .asynchronous_timer import AsynchronousTimer
-from .heartbeat_monitor import HeartbeatMonitor
-from .recorder import Recorder
+from importlib import import_module
+
+# 使用するまでimportしない（`bluetooth`だけを使う場合にOpenCVを読み込まないようにする）
+_LAZY = {
+    "AsynchronousTimer": ".asynchronous_timer",
+    "Backpressure": ".recorder",
+    "FrameHub": ".frame_hub",
+    "HeartbeatMonitor": ".heartbeat_monitor",
+    "InstantReplayRecorder": ".recorder",
+    "inplace": ".recorder",
+    "Recorder": ".recorder",
+    "restore_cfr": ".recorder",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
@@ -1,4 +1,28 @@
+from importlib import import_module
+
 from .adapter import Adapter
 from .session import ControllerColor, Session
+from .trace import read_trace, replay, TraceBuffer, TraceWriter
+
+from .decorator import bluetooth, close_bridges, Config, ConsoleMetrics, from_virtual_serial, Multiplexer, ReadMode, Transport
+
+# numpyを使用するモジュールは、使用するまでimportしない
+# btkeyLibの共有ライブラリも、Bluetooth接続を開始する子プロセスで初めて読み込まれる
+# multiprocessing.shared_memoryはPython 3.8以降でのみ使用できる
+_LAZY = {
+    "load_motion": ".motion",
+    "motion_samples": ".motion",
+    "MotionStream": ".motion",
+    "save_motion": ".motion",
+    "SharedState": ".shared_state",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-from .decorator import bluetooth, Config, from_virtual_serial
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
@@ -1,32 +1,83 @@
 from __future__ import annotations
 
+from io import UnsupportedOperation
 from typing import BinaryIO, Iterable, Iterator, List, Optional
 
-from .session import Session
+from typing_extensions import Protocol
+
+from .coalescer import Coalescer
+from .framing import LineFramer
+from .state import RawState, decode
+
+
+class StateSink(Protocol):
+    """
+    入力状態の送信先（`Session`／`SharedState`）
+    """
+
+    def is_paired(self) -> bool:
+        pass
+
+    def dispatch(self, state: RawState):
+        pass
 
 
 class Adapter(BinaryIO):
 
-    def __init__(self, session: Session) -> None:
+    def __init__(self, session: StateSink, coalesce: bool = False) -> None:
+        """
+        `Session`（または`SharedState`）に書き込む`BinaryIO`
+
+        書き込まれたデータを行単位に分割して送信する。行末に達していないデータは、続きが書き込まれるまで保持する。解釈できない行は読み飛ばし、`errors`に数える。
+
+        Args:
+            session (StateSink): 送信先の`Session`／`SharedState`
+            coalesce (bool, optional): 最新の状態だけを送信する。`flush`を呼ぶまで最後の状態は保留される（押して離す入力は失われない）。Defaults to False.
+        """
         self.__closed = False
         self.__session = session
+        self.__framer = LineFramer()
+        self.__coalescer = Coalescer() if coalesce else None
+        self.__errors = 0
 
     def __del__(self):
         self.__closed = True
 
+    @property
+    def coalesced(self) -> int:
+        """
+        送信せずに破棄した状態の数
+        """
+        return 0 if self.__coalescer is None else self.__coalescer.coalesced
+
+    @property
+    def errors(self) -> int:
+        """
+        解釈できずに読み飛ばした行の数
+        """
+        return self.__errors
+
     @property
     def is_open(self) -> bool:
         return self.__session.is_paired()
 
+    def isOpen(self) -> bool:
+        # pyserialの旧API（PokeConのSenderが使用する）
+        return self.is_open
+
     @property
     def mode(self) -> str:
-        return ""
+        return "wb"
 
     @property
     def name(self) -> str:
-        raise NotImplementedError()
+        # ファイルやポートを持たないため、表示用の名前を返す
+        return "<Adapter>"
 
     def close(self) -> None:
+        if self.__closed:
+            return
+        self.flush()
         self.__closed = True
 
     @property
@@ -34,49 +85,96 @@ class Adapter(BinaryIO):
         return self.__closed
 
     def fileno(self) -> int:
-        raise NotImplementedError()
+        raise UnsupportedOperation("fileno")
 
     def flush(self) -> None:
-        raise NotImplementedError()
+        """
+        保留中の状態を送信する
+        """
+        if self.__closed or self.__coalescer is None:
+            return
+        state = self.__coalescer.flush()
+        if not state is None:
+            self.__session.dispatch(state)
 
     def isatty(self) -> bool:
-        raise NotImplementedError()
+        return False
 
     def read(self, n: int = -1) -> bytes:
-        raise NotImplementedError()
+        raise UnsupportedOperation("read")
 
     def readable(self) -> bool:
-        raise NotImplementedError()
+        return False
 
     def readline(self, limit: int = -1) -> bytes:
-        raise NotImplementedError()
+        raise UnsupportedOperation("readline")
 
     def readlines(self, hint: int = -1) -> List[bytes]:
-        raise NotImplementedError()
+        raise UnsupportedOperation("readlines")
 
     def seek(self, offset: int, whence: int = 0) -> int:
-        raise NotImplementedError()
+        raise UnsupportedOperation("seek")
 
     def seekable(self) -> bool:
-        raise NotImplementedError()
+        return False
 
     def tell(self) -> int:
-        raise NotImplementedError()
+        raise UnsupportedOperation("tell")
 
     def truncate(self, size: Optional[int] = None) -> int:
-        raise NotImplementedError()
+        raise UnsupportedOperation("truncate")
 
     def writable(self) -> bool:
         return True
 
-    def write(self, data: bytes | bytearray) -> int:
-        d = data if isinstance(data, bytes) else bytes(data)
-        self.__session.send(data)
-        return 0
-
-    def writelines(self, lines: Iterable[bytes]) -> None:
-        for b in lines:
-            self.write(b)
+    def __dispatch(self, lines: List[bytes]):
+        session = self.__session
+        coalescer = self.__coalescer
+        for line in lines:
+            try:
+                state = decode(line)
+            except ValueError:
+                # 解釈できない行だけを読み飛ばし、後続の行（ボタンを離す入力など）は送信する
+                self.__errors += 1
+                continue
+            if not coalescer is None:
+                state = coalescer.push(state)
+                if state is None:
+                    continue
+            session.dispatch(state)
+
+    def write(self, data: bytes | bytearray | memoryview) -> int:
+        """
+        データを書き込む
+
+        bytes-likeオブジェクトをコピーせずに受け取り、完成した行を送信する。
+
+        Returns:
+            int: 書き込んだバイト数
+        """
+        if self.__closed:
+            raise ValueError("I/O operation on closed file")
+        self.__dispatch(self.__framer.feed(data))
+        # array('H')などは要素数とバイト数が異なるため、常にバイト数を返す
+        with memoryview(data) as view:
+            return view.nbytes
+
+    def writelines(self, lines: Iterable[bytes | bytearray | memoryview]) -> None:
+        if self.__closed:
+            raise ValueError("I/O operation on closed file")
+        framer = self.__framer
+        for data in lines:
+            self.__dispatch(framer.feed(data))
+
+    def dispatch_lines(self, lines: List[bytes]) -> None:
+        """
+        行単位に分割済みのデータを送信する（`read_batches`が返す行など）
+
+        `write`と異なり、行末に達していないデータを保持しないため、各要素は1行分のデータでなければならない。
+        """
+        if self.__closed:
+            raise ValueError("I/O operation on closed file")
+        self.__dispatch(lines)
 
     def __enter__(self):
         return self
@@ -85,7 +183,7 @@ class Adapter(BinaryIO):
         self.close()
 
     def __iter__(self) -> Iterator[bytes]:
-        raise NotImplementedError()
+        raise UnsupportedOperation("read")
 
     def __next__(self) -> bytes:
-        raise NotImplementedError()
+        raise UnsupportedOperation("read")
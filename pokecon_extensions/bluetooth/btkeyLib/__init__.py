@@ -12,4 +12,5 @@ DLL author: みずようかん ([@AT12806379](https://twitter.com/AT12806379))
 Port to *nix: アカツキ ([@pokemium](https://twitter.com/pokemium))
 """
 
-from .btkeyLib import start, is_paired, send_button, send_stick_l, send_stick_r, shutdown
+from .btkeyLib import start, is_paired, send_button, send_stick_l, send_stick_r, send_state, shutdown, backend, use, Backend, Library, Report
+from .mock import Call, MockLibrary
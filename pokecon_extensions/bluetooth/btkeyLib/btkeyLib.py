@@ -1,23 +1,235 @@
+from __future__ import annotations
+
 from ctypes import *
+import os
 import threading
 from time import sleep
 from pathlib import Path
 import platform
+from struct import Struct
+from typing import Optional, Tuple
+
+from typing_extensions import Protocol
+
+
+REPORT_BUTTONS = 0b00001
+REPORT_STICK_L = 0b00010
+REPORT_STICK_R = 0b00100
+REPORT_GYRO = 0b01000
+REPORT_ACCEL = 0b10000
+
+
+class Report(Structure):
+    """
+    `send_state`に渡す入力状態
+
+    `flags`に含まれる項目だけを更新する。
+    """
+    _fields_ = [
+        ("flags", c_uint32),
+        ("buttons", c_uint32),
+        ("stick_l", c_uint32 * 2),
+        ("stick_r", c_uint32 * 2),
+        ("gyro", c_int16 * 3),
+        ("accel", c_int16 * 3),
+    ]
+
+
+_REPORT = Struct("=6I6h")
+assert _REPORT.size == sizeof(Report)
+
+
+class Backend(Protocol):
+    """
+    btkeyLibの各関数を提供するオブジェクト（`Library`／`MockLibrary`）
+    """
+
+    def start(self, pad_color: int, button_color: int, leftgrip_color: int, rightgrip_color: int):
+        pass
+
+    def is_paired(self) -> bool:
+        pass
+
+    def send_button(self, key: int):
+        pass
+
+    def send_stick_l(self, horizontal: int, vertical: int):
+        pass
+
+    def send_stick_r(self, horizontal: int, vertical: int):
+        pass
+
+    def send_gyro(self, x: int, y: int, z: int):
+        pass
+
+    def send_accel(self, x: int, y: int, z: int):
+        pass
+
+    def send_state(self, buttons: Optional[int] = None, stick_l: Optional[Tuple[int, int]] = None, stick_r: Optional[Tuple[int, int]] = None,
+                   gyro: Optional[Tuple[int, int, int]] = None, accel: Optional[Tuple[int, int, int]] = None):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class Library:
+    """
+    btkeyLibの共有ライブラリ
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): 共有ライブラリのパス
+        """
+        dll = cdll.LoadLibrary(path)
+        dll.send_button.argtypes = (c_uint32, c_uint32)
+        dll.send_stick_l.argtypes = (c_uint32, c_uint32, c_uint32)
+        dll.send_stick_r.argtypes = (c_uint32, c_uint32, c_uint32)
+        dll.send_gyro.argtypes = (c_int16, c_int16, c_int16)
+        dll.send_accel.argtypes = (c_int16, c_int16, c_int16)
+        dll.send_padcolor.argtypes = (c_uint32, c_uint32, c_uint32, c_uint32)
+        dll.gamepad_paired.restype = c_bool
+
+        # 入力状態をまとめて受け取る関数は、対応しているライブラリでのみ使用する
+        try:
+            dll.send_state.argtypes = (POINTER(Report),)
+            self.__send_state = dll.send_state
+        except AttributeError:
+            self.__send_state = None
+
+        self.__dll = dll
+        # 構造体のメモリを使いまわし、struct.pack_intoで一度に書き込む
+        self.__buffer = bytearray(_REPORT.size)
+        self.__report_ref = byref(Report.from_buffer(self.__buffer))
+        self.__values = [0] * 12
 
+    @property
+    def dll(self) -> CDLL:
+        return self.__dll
 
-__btkeyLib__ = cdll.LoadLibrary(
-    str(Path(__file__).parent.joinpath({
-        "Windows": "btkeyLib.dll",
-        "Darwin": "btkeyLib.dylib",
-        "Linux": "btkeyLib.so",
-    }[platform.system()]).resolve()))
-__btkeyLib__.send_button.argtypes = (c_uint32, c_uint32)
-__btkeyLib__.send_stick_l.argtypes = (c_uint32, c_uint32, c_uint32)
-__btkeyLib__.send_stick_r.argtypes = (c_uint32, c_uint32, c_uint32)
-__btkeyLib__.send_gyro.argtypes = (c_int16, c_int16, c_int16)
-__btkeyLib__.send_accel.argtypes = (c_int16, c_int16, c_int16)
-__btkeyLib__.send_padcolor.argtypes = (c_uint32, c_uint32, c_uint32, c_uint32)
-__btkeyLib__.gamepad_paired.restype = c_bool
+    @property
+    def supports_send_state(self) -> bool:
+        return not self.__send_state is None
+
+    def start(self, pad_color: int, button_color: int, leftgrip_color: int, rightgrip_color: int):
+        self.__dll.send_padcolor(
+            pad_color, button_color, leftgrip_color, rightgrip_color)
+        threading.Thread(target=lambda: self.__dll.start_gamepad()).start()
+
+    def is_paired(self) -> bool:
+        return self.__dll.gamepad_paired()
+
+    def send_button(self, key: int):
+        self.__dll.send_button(key, 0)
+
+    def send_stick_l(self, horizontal: int, vertical: int):
+        self.__dll.send_stick_l(horizontal, vertical, 0)
+
+    def send_stick_r(self, horizontal: int, vertical: int):
+        self.__dll.send_stick_r(horizontal, vertical, 0)
+
+    def send_gyro(self, x: int, y: int, z: int):
+        self.__dll.send_gyro(x, y, z)
+
+    def send_accel(self, x: int, y: int, z: int):
+        self.__dll.send_accel(x, y, z)
+
+    def send_state(self, buttons: Optional[int] = None, stick_l: Optional[Tuple[int, int]] = None, stick_r: Optional[Tuple[int, int]] = None,
+                   gyro: Optional[Tuple[int, int, int]] = None, accel: Optional[Tuple[int, int, int]] = None):
+        """
+        入力状態をまとめて送信する
+
+        `None`の項目は更新しない。ライブラリが`send_state`に対応していない場合は、項目ごとの関数を呼び出す。
+        """
+        if self.__send_state is None:
+            dll = self.__dll
+            if not buttons is None:
+                dll.send_button(buttons, 0)
+            if not stick_l is None:
+                dll.send_stick_l(stick_l[0], stick_l[1], 0)
+            if not stick_r is None:
+                dll.send_stick_r(stick_r[0], stick_r[1], 0)
+            if not gyro is None:
+                dll.send_gyro(*gyro)
+            if not accel is None:
+                dll.send_accel(*accel)
+            return
+
+        # 送信しない項目も前回の値のまま書き込み、1回の呼び出しで送信する
+        values = self.__values
+        flags = 0
+        if not buttons is None:
+            values[1] = buttons
+            flags |= REPORT_BUTTONS
+        if not stick_l is None:
+            values[2:4] = stick_l
+            flags |= REPORT_STICK_L
+        if not stick_r is None:
+            values[4:6] = stick_r
+            flags |= REPORT_STICK_R
+        if not gyro is None:
+            values[6:9] = gyro
+            flags |= REPORT_GYRO
+        if not accel is None:
+            values[9:12] = accel
+            flags |= REPORT_ACCEL
+        values[0] = flags
+        _REPORT.pack_into(self.__buffer, 0, *values)
+        self.__send_state(self.__report_ref)
+
+    def shutdown(self):
+        # see shutdown
+        def _():
+            sleep(0.5)
+            self.__dll.shutdown_gamepad()
+        threading.Thread(target=_).start()
+
+
+_DEFAULT_PATH = str(Path(__file__).parent.joinpath({
+    "Windows": "btkeyLib.dll",
+    "Darwin": "btkeyLib.dylib",
+    "Linux": "btkeyLib.so",
+}.get(platform.system(), "btkeyLib.so")).resolve())
+
+__backend__: Optional[Backend] = None
+__lock__ = threading.Lock()
+
+
+def use(backend: Backend):
+    """
+    以降の呼び出しで使用するバックエンドを設定する
+
+    `start`などを呼び出す前に設定すれば、共有ライブラリは読み込まれない。
+    """
+    global __backend__
+    with __lock__:
+        __backend__ = backend
+
+
+def backend() -> Backend:
+    """
+    使用中のバックエンドを取得する
+
+    設定されていない場合は、初回の呼び出し時に環境変数`POKECON_BTKEYLIB`に従って用意する。
+
+    - 未設定: このフォルダのbtkeyLib.dll／btkeyLib.dylib／btkeyLib.so
+    - `mock`: 呼び出しを記録するだけの`MockLibrary`
+    - それ以外: 指定されたパスの共有ライブラリ（*nixでは、btkeyLib.soをこのフォルダに置くとbtkeyLib.pyより優先してimportされてしまうため、別の場所に置いて指定する）
+    """
+    global __backend__
+    if not __backend__ is None:
+        return __backend__
+    with __lock__:
+        if __backend__ is None:
+            path = os.environ.get("POKECON_BTKEYLIB", _DEFAULT_PATH)
+            if path == "mock":
+                from .mock import MockLibrary
+                __backend__ = MockLibrary()
+            else:
+                __backend__ = Library(path)
+        return __backend__
 
 
 def start(pad_color: int, button_color: int, leftgrip_color: int, rightgrip_color: int):
@@ -26,9 +238,7 @@ def start(pad_color: int, button_color: int, leftgrip_color: int, rightgrip_colo
 
     引数はコントローラー、ボタン、左グリップ、右グリップの色をカラーコードで指定する
     """
-    __btkeyLib__.send_padcolor(
-        pad_color, button_color, leftgrip_color, rightgrip_color)
-    threading.Thread(target=lambda: __btkeyLib__.start_gamepad()).start()
+    backend().start(pad_color, button_color, leftgrip_color, rightgrip_color)
 
 
 def is_paired() -> bool:
@@ -37,19 +247,29 @@ def is_paired() -> bool:
 
     switchと接続されるとTrueが返されます
     """
-    return __btkeyLib__.gamepad_paired()
+    return backend().is_paired()
 
 
 def send_button(key: int):
-    __btkeyLib__.send_button(key, 0)
+    backend().send_button(key)
 
 
 def send_stick_l(horizontal: int, vertical: int):
-    __btkeyLib__.send_stick_l(horizontal, vertical, 0)
+    backend().send_stick_l(horizontal, vertical)
 
 
 def send_stick_r(horizontal: int, vertical: int):
-    __btkeyLib__.send_stick_r(horizontal, vertical, 0)
+    backend().send_stick_r(horizontal, vertical)
+
+
+def send_state(buttons: Optional[int] = None, stick_l: Optional[Tuple[int, int]] = None, stick_r: Optional[Tuple[int, int]] = None,
+               gyro: Optional[Tuple[int, int, int]] = None, accel: Optional[Tuple[int, int, int]] = None):
+    """
+    入力状態をまとめて送信する関数
+
+    `None`の項目は更新しない。dllが対応していれば1回の呼び出しで送信する
+    """
+    backend().send_state(buttons, stick_l, stick_r, gyro, accel)
 
 
 def shutdown():
@@ -65,10 +285,7 @@ def shutdown():
     なぜだか不明だが、別スレッドでわずかに待機してから実行すると正常に終了した。デストラクタの呼び出し前にプロセスが後始末されるから？
 
     """
-    def _():
-        sleep(0.5)
-        __btkeyLib__.shutdown_gamepad()
-    threading.Thread(target=_).start()
+    backend().shutdown()
 
 
 def gyro(x: int, y: int, z: int):
@@ -81,7 +298,7 @@ def gyro(x: int, y: int, z: int):
 
     dll側では符号付き整数で受け取っているので、符号周りの変換が必要
     """
-    __btkeyLib__.send_gyro(x, y, z)
+    backend().send_gyro(x, y, z)
 
 
 def accel(x: int, y: int, z: int):
@@ -94,4 +311,4 @@ def accel(x: int, y: int, z: int):
 
     dll側では符号付き整数で受け取っているので、符号周りの変換が必要
     """
-    __btkeyLib__.send_accel(x, y, z)
+    backend().send_accel(x, y, z)
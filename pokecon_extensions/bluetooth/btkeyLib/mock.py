@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from collections import deque
+from time import perf_counter
+from typing import Any, Deque, NamedTuple, Optional, Tuple
+
+
+class Call(NamedTuple):
+    time: float
+    """
+    呼び出された時刻（`time.perf_counter()`基準）
+    """
+    name: str
+    args: Tuple[Any, ...]
+
+
+class MockLibrary:
+    """
+    呼び出しを記録するだけのバックエンド
+
+    Switchやドングルを使用せずに、ベンチマークや動作確認を行うために使用する。
+    """
+
+    def __init__(self, pairing_delay: float = 0.0, maxlen: Optional[int] = None) -> None:
+        """
+        Args:
+            pairing_delay (float, optional): `start`からペアリング完了までの秒数。Defaults to 0.0.
+            maxlen (Optional[int], optional): 記録する呼び出しの最大数。Defaults to None（無制限）.
+        """
+        self.__pairing_delay = pairing_delay
+        self.__started_at: float | None = None
+        self.__calls: Deque[Call] = deque(maxlen=maxlen)
+
+    @property
+    def calls(self) -> Deque[Call]:
+        """
+        記録された呼び出し
+        """
+        return self.__calls
+
+    def __record(self, name: str, *args: Any):
+        self.__calls.append(Call(perf_counter(), name, args))
+
+    def start(self, pad_color: int, button_color: int, leftgrip_color: int, rightgrip_color: int):
+        self.__started_at = perf_counter()
+        self.__record("start", pad_color, button_color,
+                      leftgrip_color, rightgrip_color)
+
+    def is_paired(self) -> bool:
+        return not self.__started_at is None and self.__started_at + self.__pairing_delay <= perf_counter()
+
+    def send_button(self, key: int):
+        self.__record("send_button", key)
+
+    def send_stick_l(self, horizontal: int, vertical: int):
+        self.__record("send_stick_l", horizontal, vertical)
+
+    def send_stick_r(self, horizontal: int, vertical: int):
+        self.__record("send_stick_r", horizontal, vertical)
+
+    def send_gyro(self, x: int, y: int, z: int):
+        self.__record("send_gyro", x, y, z)
+
+    def send_accel(self, x: int, y: int, z: int):
+        self.__record("send_accel", x, y, z)
+
+    def send_state(self, buttons: Optional[int] = None, stick_l: Optional[Tuple[int, int]] = None, stick_r: Optional[Tuple[int, int]] = None,
+                   gyro: Optional[Tuple[int, int, int]] = None, accel: Optional[Tuple[int, int, int]] = None):
+        self.__record("send_state", buttons, stick_l, stick_r, gyro, accel)
+
+    def shutdown(self):
+        self.__started_at = None
+        self.__record("shutdown")
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from .state import NEUTRAL, RawState
+
+
+class Coalescer:
+    """
+    連続した入力状態を間引き、最新の状態だけを送信する
+
+    ボタンを押して離すまでのあいだに一度も送信されない場合は、押した状態を先に送信するため、入力が失われることはない。
+    """
+
+    def __init__(self, sent: RawState = NEUTRAL) -> None:
+        """
+        Args:
+            sent (RawState, optional): 直前に送信した状態。Defaults to `NEUTRAL`.
+        """
+        self.__sent = sent.buttons
+        self.__pending: RawState | None = None
+        self.__coalesced = 0
+
+    @property
+    def coalesced(self) -> int:
+        """
+        送信せずに破棄した状態の数
+        """
+        return self.__coalesced
+
+    def push(self, state: RawState) -> Optional[RawState]:
+        """
+        状態を追加する
+
+        Returns:
+            Optional[RawState]: 直ちに送信する必要がある状態
+        """
+        pending = self.__pending
+        if pending is None:
+            self.__pending = state
+            return None
+
+        # 未送信のボタンの変化を、stateが元に戻してしまう場合は先に送信する
+        if (self.__sent ^ pending.buttons) & (pending.buttons ^ state.buttons):
+            self.__sent = pending.buttons
+            self.__pending = state
+            return pending
+
+        # 更新されないスティックは、破棄する状態の値を引き継ぐ
+        if (state.l is None and not pending.l is None) or (state.r is None and not pending.r is None):
+            state = state._replace(l=pending.l if state.l is None else state.l,
+                                   r=pending.r if state.r is None else state.r)
+        self.__pending = state
+        self.__coalesced += 1
+        return None
+
+    def flush(self) -> Optional[RawState]:
+        """
+        保留中の状態を取り出す
+
+        Returns:
+            Optional[RawState]: 送信する状態。保留中の状態がなければ`None`
+        """
+        pending = self.__pending
+        if pending is None:
+            return None
+        self.__sent = pending.buttons
+        self.__pending = None
+        return pending
@@ -1,3 +1,6 @@
+from .bridge import close_bridges
 from .decorator import bluetooth
-from .config import Config
+from .config import Config, Transport
+from .reader import ReadMode
 from .from_virtual_serial import from_virtual_serial
+from .multiplexer import ConsoleMetrics, Multiplexer
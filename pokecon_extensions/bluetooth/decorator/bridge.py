@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import atexit
+from contextlib import AbstractContextManager, nullcontext
+import multiprocessing as mp
+from multiprocessing.connection import Connection
+import threading as th
+from types import TracebackType
+from typing import Any, Callable, Optional, Union
+
+from .config import Config, Transport
+from .from_virtual_serial import from_virtual_serial
+from .in_process import InProcessBridge, replace_serial
+from ..adapter import Adapter
+
+
+def _run(target: Callable[..., None], args: tuple, conn: Connection):
+    try:
+        target(*args)
+    except BaseException as e:
+        try:
+            conn.send(e)
+        except Exception:
+            # 例外オブジェクトがpickleできない場合
+            conn.send(RuntimeError(repr(e)))
+    finally:
+        conn.close()
+
+
+class Bridge(AbstractContextManager):
+    """
+    `from_virtual_serial`（`Transport.SharedMemory`の場合は`from_shared_state`）を実行する子プロセス
+
+    `multiprocessing.Manager`のサーバープロセスを使用せず、`multiprocessing.Event`で状態を伝達する。
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.__config = config
+        self.__is_paired = mp.Event()
+        self.__cancel = mp.Event()
+        self.__shared = None
+        self.__adapter: Optional[Adapter] = None
+
+        if config.transport == Transport.SharedMemory:
+            # Python 3.8以降で使用できるため、必要になるまでimportしない
+            from .from_shared_state import from_shared_state
+            from ..shared_state import SharedState
+
+            doorbell = mp.Event()
+            self.__shared = SharedState(create=True, doorbell=doorbell)
+            self.__adapter = Adapter(self.__shared)
+            target, args = from_shared_state, (config, self.__shared.name,
+                                               doorbell, self.__is_paired, self.__cancel)
+        else:
+            target, args = from_virtual_serial, (config,
+                                                 self.__is_paired, self.__cancel)
+
+        self.__receiver, sender = mp.Pipe(duplex=False)
+        self.__process = mp.Process(target=_run,
+                                    args=(target, args, sender),
+                                    daemon=True)
+        self.__process.start()
+        # 子プロセス側の終端だけが残るようにする
+        sender.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, __exc_type: type[BaseException] | None, __exc_value: BaseException | None, __traceback: TracebackType | None) -> bool | None:
+        self.close()
+        return None
+
+    @property
+    def config(self) -> Config:
+        return self.__config
+
+    def is_alive(self) -> bool:
+        return self.__process.is_alive()
+
+    def is_paired(self) -> bool:
+        return self.__is_paired.is_set()
+
+    def wait_for_pairing(self, timeout: float | None = None) -> bool:
+        """
+        ペアリングの完了を待機する
+
+        Returns:
+            bool: ペアリングが完了していれば`True`
+        """
+        return self.__is_paired.wait(timeout)
+
+    @property
+    def shared_state_name(self) -> Optional[str]:
+        """
+        入力状態を置いた共有メモリの名前（`Transport.SharedMemory`の場合のみ）
+
+        `SharedState(name)`で接続すれば、ほかのプロセスからも最新の入力状態を読み出せる。
+        """
+        return None if self.__shared is None else self.__shared.name
+
+    def connect(self, command: Any):
+        """
+        コマンドの実行中に必要な準備をおこなう
+
+        `Transport.SharedMemory`の場合はPokeConのシリアルポートを共有メモリに書き込む`Adapter`に置き換え、それ以外は何もしない。
+
+        Args:
+            command (PythonCommand): 実行するコマンド（`self`）
+        """
+        if self.__adapter is None:
+            return nullcontext()
+        return replace_serial(command, self.__adapter)
+
+    def close(self):
+        """
+        子プロセスに停止を要求し、終了を待機する
+
+        Raises:
+            Exception: 子プロセスで発生した例外
+        """
+        if self.__cancel.is_set():
+            return
+        self.__cancel.set()
+
+        print("shutdown connection...")
+        self.__process.join()
+        if self.__process.exitcode != 0:
+            # see btkeyLib.py, shutdown
+            print(f"bridge process exited with code {self.__process.exitcode}")
+
+        if not self.__shared is None:
+            self.__shared.close()
+
+        error = None
+        try:
+            if self.__receiver.poll():
+                error = self.__receiver.recv()
+        except EOFError:
+            # 正常に終了した場合
+            pass
+        finally:
+            self.__receiver.close()
+        if not error is None:
+            raise error
+
+
+AnyBridge = Union[Bridge, InProcessBridge]
+
+_bridges: dict[tuple[Transport, str], AnyBridge] = {}
+_lock = th.Lock()
+
+
+def _create(config: Config) -> AnyBridge:
+    if config.transport == Transport.InProcess:
+        return InProcessBridge(config)
+    return Bridge(config)
+
+
+def attach(config: Config) -> AnyBridge:
+    """
+    設定に対応する子プロセスを取得する
+
+    `config.persistent`が`True`の場合、以前のコマンドで起動した子プロセスが残っていれば再利用するため、ペアリングをやり直さない。
+
+    Args:
+        config (Config): Configオブジェクト
+    """
+    if not config.persistent:
+        return _create(config)
+
+    key = config.transport, config.port
+    with _lock:
+        bridge = _bridges.get(key)
+        if not bridge is None and (not bridge.is_alive() or bridge.config != config):
+            # 異常終了していたり、設定が変更されていれば起動しなおす
+            del _bridges[key]
+            bridge.close()
+            bridge = None
+        if bridge is None:
+            bridge = _create(config)
+            _bridges[key] = bridge
+        return bridge
+
+
+def detach(bridge: AnyBridge):
+    """
+    コマンドの終了時に呼び出す
+
+    `config.persistent`が`False`の場合は子プロセスを停止し、`True`の場合は次のコマンドのために残しておく。
+
+    Args:
+        bridge (AnyBridge): `attach`で取得した子プロセス
+    """
+    if not bridge.config.persistent:
+        bridge.close()
+
+
+@atexit.register
+def close_bridges():
+    """
+    残しておいた子プロセスをすべて停止する
+
+    PokeConの終了時に自動で呼び出される。
+    """
+    with _lock:
+        bridges = list(_bridges.values())
+        _bridges.clear()
+    for bridge in bridges:
+        try:
+            bridge.close()
+        except Exception as e:
+            print(f"failed to close bridge: {e!r}")
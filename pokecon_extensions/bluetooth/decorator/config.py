@@ -1,63 +1,162 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor, wait
+from enum import Enum, auto
 import glob
-
+from os import path
 import platform
+import threading as th
+from time import perf_counter
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, root_validator, validator
 from serial import Serial, SerialException
+from serial.tools.list_ports import comports
 
 from ..session import ControllerColor
+from .reader import ReadMode
+
+
+PROBE_TIMEOUT = 1.0
+"""
+ポートを開けるか確認する際の最大待機秒数
+"""
 
+CACHE_TTL = 30.0
+"""
+ポートの一覧を再利用する秒数
+"""
 
-def _list_ports():
+_cache: tuple[float, list[str]] | None = None
+_lock = th.Lock()
+
+
+def _candidates():
     """
     https://stackoverflow.com/questions/12090503/listing-available-com-ports-with-python
     """
     if platform.system() == "Windows":
-        ports = ['COM%s' % (i + 1) for i in range(256)]
+        return ['COM%s' % (i + 1) for i in range(256)]
     elif platform.system() == "Darwin":
-        ports = glob.glob('/dev/tty.*')
+        return glob.glob('/dev/tty.*')
     elif platform.system() == "Linux":
-        ports = glob.glob('/dev/tty[A-Za-z]*')
+        return glob.glob('/dev/tty[A-Za-z]*')
     else:
         raise EnvironmentError('Unsupported platform')
 
-    result: list[str] = []
-    for port in ports:
-        try:
-            s = Serial(port)
-            s.close()
-            result.append(port)
-        except (OSError, SerialException):
-            pass
-    return result
+
+def _probe(port: str) -> bool:
+    try:
+        s = Serial(port)
+        s.close()
+        return True
+    except (OSError, SerialException):
+        return False
+
+
+def _list_ports(ttl: float = CACHE_TTL) -> list[str]:
+    """
+    使用できるシリアルポートの一覧を取得する
+
+    pyserialが列挙したポートに加えて、列挙されなかった候補を並列に開いて確認する。結果は`ttl`秒間再利用する。
+
+    Args:
+        ttl (float, optional): 前回の結果を再利用する秒数。Defaults to `CACHE_TTL`.
+    """
+    global _cache
+
+    with _lock:
+        if not _cache is None and perf_counter() < _cache[0] + ttl:
+            return list(_cache[1])
+
+        result = [port.device for port in comports()]
+
+        remaining = [port for port in _candidates() if not port in result]
+        executor = ThreadPoolExecutor(max_workers=32)
+        futures = {executor.submit(_probe, port): port for port in remaining}
+        # 応答のないポートは待たずに打ち切る
+        done, not_done = wait(futures, timeout=PROBE_TIMEOUT)
+        # 開始していない確認は取り消し、ブリッジが開くポートと競合しないようにする（`cancel_futures`はPython 3.9以降）
+        for future in not_done:
+            future.cancel()
+        executor.shutdown(wait=False)
+        result.extend(futures[f] for f in futures if f in done and f.result())
+
+        _cache = perf_counter(), result
+        return list(result)
+
+
+class Transport(Enum):
+    VirtualSerial = auto()
+    """
+    仮想シリアルポートを経由して、子プロセスでBluetooth接続をおこなう
+    """
+    InProcess = auto()
+    """
+    PokeConのシリアルポートを置き換え、PokeConのプロセス内でBluetooth接続をおこなう（仮想シリアルポートは不要）
+    """
+    SharedMemory = auto()
+    """
+    PokeConのシリアルポートを置き換え、共有メモリを経由して子プロセスに入力状態を渡す（仮想シリアルポートは不要）
+
+    直近`shared_state.CAPACITY`回の更新を保持するため、押して離す入力も順に送信する。`coalesce`は使用しない。
+    """
 
 
 class Config(BaseModel):
     """
-    仮想シリアルポートを経由して、Bluetooth接続をおこなう設定
+    Bluetooth接続をおこなう設定
     """
-    port: str
+    transport: Transport = Transport.VirtualSerial
     """
-    PokeConに設定した仮想シリアルポートと対になるポート名
+    PokeConからBluetoothへの受け渡し方法
     """
-    baudrate: int
+    port: str = ""
     """
-    PokeCon側で使用しているボーレート
+    PokeConに設定した仮想シリアルポートと対になるポート名（`Transport.VirtualSerial`の場合のみ）
+    """
+    baudrate: int = 9600
+    """
+    PokeCon側で使用しているボーレート（`Transport.VirtualSerial`の場合のみ）
     """
     timeout: int = 30
     """
     ペアリングの最大待機秒数
     """
+    settle: float = 1.0
+    """
+    ペアリング完了後、コマンドを開始するまでの待機秒数（暴発防止）
+    """
     conrtoller_color: ControllerColor = ControllerColor()
     """
     コントローラーの配色（`0x0`-`0xFFFFFF`）
     """
+    read_mode: ReadMode = ReadMode.Blocking
+    """
+    仮想シリアルポートの読み出し方式
+    """
+    coalesce: bool = False
+    """
+    受信済みの行をまとめて読み出し、最新の状態だけを送信する（押して離す入力は失われない、`Transport.VirtualSerial`の場合のみ）
+    """
+    trace: str = ""
+    """
+    送信した入力状態を時刻とともに記録するファイルのパス（空文字列の場合は記録しない、`read_trace`／`replay`で再生できる）
+    """
+    persistent: bool = False
+    """
+    コマンドの終了後も接続を維持し、同じポートを使用するコマンドで再利用する
 
-    @validator("port")
-    def port_must_exist(cls, value: str):
-        # assert value in _list_ports()
-        return value
+    `Transport.InProcess`／`Transport.SharedMemory`では、PokeConの終了まで接続を維持するため`True`を推奨する。
+    """
+
+    @root_validator(skip_on_failure=True)
+    def port_must_exist(cls, values: dict):
+        if values["transport"] != Transport.VirtualSerial:
+            return values
+        value = values["port"]
+        # 見つからなければ、キャッシュを使わずにもう一度確認する
+        assert value in _list_ports() or value in _list_ports(ttl=0) or (
+            platform.system() != "Windows" and path.exists(value)), f"{value} is not found"
+        return values
 
     @validator("baudrate")
     def baudrate_must_be_one_of(cls, value: int):
@@ -69,3 +168,14 @@ class Config(BaseModel):
     def timeout_must_be_positive(cls, value: int):
         assert 0 <= value
         return value
+
+    @validator("settle")
+    def settle_must_be_positive(cls, value: float):
+        assert 0 <= value
+        return value
+
+    @validator("read_mode")
+    def read_mode_must_be_supported(cls, value: ReadMode):
+        # Windowsのシリアルポートはselectで監視できない
+        assert value != ReadMode.Select or platform.system() != "Windows"
+        return value
@@ -1,13 +1,10 @@
 from __future__ import annotations
 
-from concurrent.futures import ProcessPoolExecutor
-from concurrent.futures.process import BrokenProcessPool
-import multiprocessing as mp
 from time import perf_counter, sleep
 from typing_extensions import Protocol
 
+from .bridge import attach, detach
 from .config import Config
-from .from_virtual_serial import from_virtual_serial
 
 
 class PythonCommand(Protocol):
@@ -25,6 +22,10 @@ def bluetooth(config: Config):
 
     ペアリング待機中にキャンセルされた場合、最大待機秒数まで待機したのち、コマンドを停止します。
 
+    `Config.persistent`を`True`にすると、コマンドの終了後も接続を維持し、次のコマンドではペアリングを省略します。
+
+    `Config.transport`を`Transport.InProcess`にすると、仮想シリアルポートを使用せず、PokeConのプロセス内から直接送信します。
+
     Args:
         config (Config): Configオブジェクト
     """
@@ -33,30 +34,29 @@ def bluetooth(config: Config):
 
             self: PythonCommand = args[0]
 
-            with mp.Manager() as manager, ProcessPoolExecutor(max_workers=1) as executor:
-                cancel = manager.Event()
-                is_paired = manager.Event()
+            start_time = perf_counter()
+            bridge = attach(config)
+            try:
+                print(
+                    f"bridge started in {perf_counter() - start_time:.3f} s")
 
-                conn = executor.submit(from_virtual_serial,
-                                       config, is_paired, cancel)
-
-                try:
-                    start_time = perf_counter()
+                # 以前のコマンドからペアリングが継続している場合は待機しない
+                if not bridge.is_paired():
                     print("wait for pairing...")
-                    while not is_paired.is_set() and perf_counter() < start_time + config.timeout:
-                        sleep(1)
+                    while perf_counter() < start_time + config.timeout:
+                        # 中断に応答できるよう、短い間隔で待機する
+                        if bridge.wait_for_pairing(0.1):
+                            break
                         self.checkIfAlive()
 
-                    sleep(1)  # 暴発防止
+                    sleep(config.settle)  # 暴発防止
+
+                print(
+                    f"command started in {perf_counter() - start_time:.3f} s")
+                with bridge.connect(self):
                     func(*args, **kwargs)
 
-                finally:
-                    cancel.set()
-                    try:
-                        print("shutdown connection...")
-                        conn.result()
-                    except BrokenProcessPool:
-                        # see btkeyLib.py, shutdown
-                        print("BrokenProcessPool occured")
+            finally:
+                detach(bridge)
         return _wrapper
     return _bluetooth
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import threading as th
+
+from .config import Config
+from .reader import READ_TIMEOUT
+from ..session import Session
+from ..shared_state import SharedState
+from ..trace import open_trace
+
+
+def from_shared_state(config: Config, name: str, doorbell: th.Event, is_paired: th.Event, cancel: th.Event):
+    """
+    共有メモリを経由して、PokeConの入力状態をBluetoothに引き渡す
+
+    書き込みのたびにセットされる`doorbell`で待機し、前回から書き込まれた状態を順に送信する（押して離す入力も失われない）。テキストを解析しないため、入力の頻度によらず一定の時間で処理できる。
+
+    Args:
+        config (Config): Configオブジェクト
+        name (str): `SharedState`の名前
+        doorbell (th.Event): 書き込みを通知するイベントオブジェクト
+        is_paired (th.Event): ペアリング成功を伝達するイベントオブジェクト
+        cancel (th.Event): 停止用のイベントオブジェクト
+    """
+    with SharedState(name) as shared, open_trace(config.trace) as trace, Session(controller_color=config.conrtoller_color, pairing_timeout=config.timeout, trace=trace) as session:
+        shared.set_paired(True)
+        is_paired.set()
+
+        seq = 0
+        motion = (0, 0, 0), (0, 0, 0)
+        try:
+            while not cancel.is_set():
+                if not doorbell.wait(READ_TIMEOUT):
+                    continue
+                # 読み出す前に解除し、読み出し中の書き込みを取りこぼさないようにする
+                doorbell.clear()
+
+                for snapshot in shared.updates(seq):
+                    seq = snapshot.seq
+
+                    # 変化のない項目はSession側で送信を省略する
+                    session.dispatch(snapshot.state)
+                    if (snapshot.gyro, snapshot.accel) != motion:
+                        motion = snapshot.gyro, snapshot.accel
+                        session.send_motion(*motion)
+        finally:
+            shared.set_paired(False)
+            if 0 < shared.lost:
+                print(f"shared state: {shared.lost} updates were lost")
@@ -5,8 +5,10 @@ import threading as th
 from serial import Serial
 
 from .config import Config
+from .reader import read_batches
 from ..adapter import Adapter
 from ..session import Session
+from ..trace import open_trace
 
 
 def from_virtual_serial(config: Config, is_paired: th.Event, cancel: th.Event):
@@ -19,13 +21,16 @@ def from_virtual_serial(config: Config, is_paired: th.Event, cancel: th.Event):
         is_paired (th.Event): ペアリング成功を伝達するイベントオブジェクト
         cancel (th.Event): 停止用のイベントオブジェクト
     """
-    with Serial(config.port, config.baudrate, timeout=0) as ser, Session(controller_color=config.conrtoller_color, pairing_timeout=config.timeout) as session, Adapter(session) as adapter:
+    with Serial(config.port, config.baudrate) as ser, open_trace(config.trace) as trace, Session(controller_color=config.conrtoller_color, pairing_timeout=config.timeout, trace=trace) as session, Adapter(session, coalesce=config.coalesce) as adapter:
         is_paired.set()
-        while not cancel.is_set():
-
-            # シリアルポートはブロックせず、読み出すデータがなければすぐに空文字列を返す。
-            data = ser.readline()
-            if data == b"":
-                continue
-
-            adapter.write(data)
+        for lines in read_batches(ser, config.read_mode, cancel):
+            # read_batchesが行に分割済みのため、Adapterで分割しなおさない
+            adapter.dispatch_lines(lines)
+            # 受信済みの行をすべて読み出してから、最新の状態を送信する
+            if config.coalesce and ser.in_waiting == 0:
+                adapter.flush()
+
+        if config.coalesce:
+            print(f"coalesced: {adapter.coalesced}")
+        if 0 < adapter.errors:
+            print(f"skipped {adapter.errors} invalid lines")
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from contextlib import AbstractContextManager, contextmanager
+import threading as th
+from types import TracebackType
+from typing import Any, Iterator, Optional
+
+from .config import Config
+from ..adapter import Adapter
+from ..session import Session
+from ..trace import TraceWriter
+
+
+@contextmanager
+def replace_serial(command: Any, adapter: Adapter) -> Iterator[None]:
+    # PythonCommand.keys（KeyPress）.ser（Sender）.ser（serial.Serial）を差し替える
+    try:
+        sender = command.keys.ser
+        original = sender.ser
+    except AttributeError:
+        raise RuntimeError(
+            "serial port of PokeCon was not found; this transport is not supported in this version")
+
+    sender.ser = adapter
+    try:
+        yield
+    finally:
+        sender.ser = original
+
+
+class InProcessBridge(AbstractContextManager):
+    """
+    PokeConのプロセス内で`Session`を保持する
+
+    コマンドの実行中はPokeConのシリアルポートを`Adapter`に置き換えるため、入力は仮想シリアルポートや子プロセスを経由せずに直接送信される。
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.__config = config
+        self.__is_paired = th.Event()
+        self.__closed = False
+        self.__trace: Optional[TraceWriter] = None
+        self.__session: Optional[Session] = None
+        self.__adapter: Optional[Adapter] = None
+        self.__error: Optional[BaseException] = None
+
+        # ペアリングを待機している間もコマンドの中断に応答できるよう、別スレッドで接続する
+        self.__thread = th.Thread(target=self.__connect, daemon=True)
+        self.__thread.start()
+
+    def __connect(self):
+        try:
+            if self.__config.trace:
+                self.__trace = TraceWriter(self.__config.trace)
+            self.__session = Session(controller_color=self.__config.conrtoller_color,
+                                     pairing_timeout=self.__config.timeout,
+                                     trace=self.__trace)
+            self.__adapter = Adapter(self.__session)
+            self.__is_paired.set()
+        except BaseException as e:
+            self.__error = e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, __exc_type: type[BaseException] | None, __exc_value: BaseException | None, __traceback: TracebackType | None) -> bool | None:
+        self.close()
+        return None
+
+    @property
+    def config(self) -> Config:
+        return self.__config
+
+    def is_alive(self) -> bool:
+        return not self.__closed and self.__error is None
+
+    def is_paired(self) -> bool:
+        return self.__is_paired.is_set()
+
+    def wait_for_pairing(self, timeout: float | None = None) -> bool:
+        """
+        ペアリングの完了を待機する
+
+        Returns:
+            bool: ペアリングが完了していれば`True`
+        """
+        return self.__is_paired.wait(timeout)
+
+    def connect(self, command: Any):
+        """
+        コマンドの実行中、PokeConのシリアルポートを`Adapter`に置き換える
+
+        Args:
+            command (PythonCommand): 実行するコマンド（`self`）
+        """
+        if not self.__error is None:
+            raise self.__error
+        if self.__adapter is None:
+            raise RuntimeError("session is not ready")
+        return replace_serial(command, self.__adapter)
+
+    def close(self):
+        """
+        接続を終了する
+
+        Raises:
+            Exception: 接続時に発生した例外
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+
+        print("shutdown connection...")
+        self.__thread.join()
+        if not self.__adapter is None:
+            self.__adapter.close()
+        if not self.__session is None:
+            self.__session.close()
+        if not self.__trace is None:
+            self.__trace.close()
+        if not self.__error is None:
+            raise self.__error
@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+from contextlib import AbstractContextManager
+from logging import DEBUG, NullHandler, getLogger
+import multiprocessing as mp
+from multiprocessing.connection import Connection
+import os
+import platform
+import selectors
+import threading as th
+from time import monotonic, perf_counter_ns
+from types import TracebackType
+from typing import List, NamedTuple, Optional
+
+from serial import Serial
+
+from .bridge import _run
+from .config import Config, Transport
+from .reader import READ_TIMEOUT, ReadMode, read_batches
+from ..adapter import Adapter
+from ..session import Session
+from ..state import RawState
+from ..trace import open_trace, pack_records, TraceRecord, unpack_records
+
+
+# 子プロセスと共有する統計値の位置
+_BATCHES, _DISPATCHED, _SUPPRESSED, _LATENCY_SUM, _LATENCY_MAX = range(5)
+
+
+def _work(config: Config, conn: Connection, is_paired: th.Event, stats):
+    # btkeyLibはプロセスに1つしか接続を持てないため、コンソールごとに1つの子プロセスで実行する
+    with open_trace(config.trace) as trace, Session(controller_color=config.conrtoller_color, pairing_timeout=config.timeout, trace=trace) as session:
+        is_paired.set()
+        while True:
+            # 空のメッセージが停止要求（forkした兄弟プロセスも送信側の終端を持つため、EOFは届かない）
+            data = conn.recv_bytes()
+            if len(data) == 0:
+                break
+
+            records = unpack_records(data)
+            for _, state in records:
+                session.dispatch(state)
+
+            # 受信してから送信し終えるまでの時間（バッチの先頭の状態で計測する）
+            latency = (perf_counter_ns() - records[0].time) / 1e9
+            stats[_BATCHES] += 1
+            stats[_DISPATCHED] += len(records)
+            stats[_SUPPRESSED] = session.suppressed
+            stats[_LATENCY_SUM] += latency
+            stats[_LATENCY_MAX] = max(stats[_LATENCY_MAX], latency)
+
+
+class _PipeSink:
+    """
+    `Adapter`が送信する状態を溜めておき、子プロセスにまとめて送る
+    """
+
+    def __init__(self, conn: Connection, is_paired: th.Event) -> None:
+        self.__conn = conn
+        self.__is_paired = is_paired
+        self.__records: List[TraceRecord] = []
+
+    def is_paired(self) -> bool:
+        return self.__is_paired.is_set()
+
+    def dispatch(self, state: RawState):
+        self.__records.append(TraceRecord(perf_counter_ns(), state))
+
+    def submit(self) -> int:
+        """
+        溜めておいた状態を送信する
+
+        Raises:
+            BrokenPipeError: 子プロセスが終了している場合（溜めておいた状態は破棄する）
+        """
+        records = self.__records
+        if len(records) == 0:
+            return 0
+        self.__records = []
+        self.__conn.send_bytes(pack_records(records))
+        return len(records)
+
+
+class ConsoleMetrics(NamedTuple):
+    port: str
+    alive: bool
+    """
+    子プロセスが動作しているか（子プロセスに送信できなくなった場合は`False`）
+    """
+    paired: bool
+    received: int
+    """
+    受信したバイト数
+    """
+    lines: int
+    """
+    受信した行数
+    """
+    coalesced: int
+    """
+    間引いた状態の数（`Config.coalesce`が`True`の場合）
+    """
+    dispatched: int
+    """
+    子プロセスが`Session.dispatch`を呼び出した回数
+    """
+    suppressed: int
+    """
+    直前と同じ値だったため、btkeyLibの呼び出しを省略した回数
+    """
+    errors: int
+    """
+    解釈できずに読み飛ばした行の数
+    """
+    latency_mean: float
+    """
+    受信してから送信するまでの平均時間（秒）
+    """
+    latency_max: float
+    """
+    受信してから送信するまでの最大時間（秒）
+    """
+
+
+class _Console:
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.is_paired = mp.Event()
+        self.stats = mp.Array("d", 5, lock=False)
+
+        receiver, self.__sender = mp.Pipe(duplex=False)
+        self.__errors, errors = mp.Pipe(duplex=False)
+        self.process = mp.Process(target=_run,
+                                  args=(_work, (config, receiver, self.is_paired, self.stats), errors),
+                                  daemon=True)
+        self.process.start()
+        # 子プロセス側の終端だけが残るようにする
+        receiver.close()
+        errors.close()
+
+        self.__sink = _PipeSink(self.__sender, self.is_paired)
+        # 解釈できない行はAdapterが読み飛ばし、後続の行は送信する
+        self.__adapter = Adapter(self.__sink, coalesce=config.coalesce)
+        self.ser: Optional[Serial] = None
+
+        self.alive = True
+        self.received = 0
+        self.sent = 0
+        self.__error: Optional[BaseException] = None
+        self.__error_taken = False
+
+    def write(self, data: bytes):
+        self.received += len(data)
+        if not self.alive:
+            return
+        self.__adapter.write(data)
+        self.__submit()
+
+    def writelines(self, lines: List[bytes]):
+        # read_batchesが行に分割済みのため、Adapterで分割しなおさない
+        self.received += sum(map(len, lines))
+        if not self.alive:
+            return
+        self.__adapter.dispatch_lines(lines)
+        self.__submit()
+
+    def __submit(self):
+        # 受信済みの行をすべて読み出してから、最新の状態を送信する
+        if self.config.coalesce and self.ser.in_waiting == 0:
+            self.__adapter.flush()
+        try:
+            self.sent += self.__sink.submit()
+        except (BrokenPipeError, EOFError):
+            # 子プロセスが異常終了した場合は、このコンソールだけを停止する
+            self.alive = False
+
+    def metrics(self) -> ConsoleMetrics:
+        stats = self.stats
+        batches = stats[_BATCHES]
+        coalesced = self.__adapter.coalesced
+        return ConsoleMetrics(self.config.port, self.alive and self.process.is_alive(), self.is_paired.is_set(),
+                              self.received, self.sent + coalesced, coalesced,
+                              int(stats[_DISPATCHED]), int(stats[_SUPPRESSED]), self.__adapter.errors,
+                              stats[_LATENCY_SUM] / batches if 0 < batches else 0.0, stats[_LATENCY_MAX])
+
+    def take_error(self) -> Optional[BaseException]:
+        """
+        終了した子プロセスで発生した例外を取り出す（2回目以降は`None`）
+        """
+        self.__read_error()
+        if self.__error_taken:
+            return None
+        self.__error_taken = True
+        if self.__error is None and self.process.exitcode != 0:
+            return RuntimeError(
+                f"{self.config.port}: worker process exited with code {self.process.exitcode}")
+        return self.__error
+
+    def __read_error(self):
+        if self.__errors.closed:
+            return
+        try:
+            if self.__errors.poll():
+                self.__error = self.__errors.recv()
+        except EOFError:
+            # 正常に終了した場合
+            pass
+        finally:
+            self.__errors.close()
+
+    def close(self) -> Optional[BaseException]:
+        try:
+            self.__sender.send_bytes(b"")
+        except OSError:
+            # 子プロセスが異常終了している場合
+            pass
+        self.__sender.close()
+        self.process.join()
+        if self.process.exitcode != 0:
+            # see btkeyLib.py, shutdown
+            print(f"{self.config.port}: worker process exited with code {self.process.exitcode}")
+
+        self.__read_error()
+        if self.__error_taken:
+            return None
+        self.__error_taken = True
+        return self.__error
+
+
+class Multiplexer(th.Thread, AbstractContextManager):
+    """
+    複数のコンソールの接続を1か所で管理し、コンソールごとの統計値を取得する
+
+    - すべての仮想シリアルポートを1つのスレッドで読み出し（*nixでは`selectors`、Windowsではポートごとのスレッド）、コンソールごとの子プロセスに引き渡す
+    - `wait_for_pairing`／`metrics`／`close`で、すべてのコンソールをまとめて扱う
+    - 子プロセスが異常終了したコンソールは読み出しを停止し、ほかのコンソールは動作を続ける
+
+    性能を改善するための機能ではない。btkeyLibはプロセスに1つしか接続を持てないため、子プロセスはコンソールの数だけ起動し、
+    プロセス間の受け渡しが増える分、CPU時間は`ReadMode.Blocking`の`Bridge`よりやや多い（tests/bluetooth/benchmark_multiplexer.py）。
+    """
+
+    def __init__(self, configs: List[Config]):
+        """
+        Args:
+            configs (List[Config]): コンソールごとの設定（`transport`と`read_mode`は使用しない）
+        """
+        super().__init__(daemon=True)
+
+        self.__logger = getLogger(__name__)
+        self.__logger.addHandler(NullHandler())
+        self.__logger.setLevel(DEBUG)
+        self.__logger.propagate = True
+
+        for config in configs:
+            if config.transport != Transport.VirtualSerial:
+                raise ValueError("only Transport.VirtualSerial is supported")
+        if len(set(config.port for config in configs)) != len(configs):
+            raise ValueError("ports must be unique")
+
+        self.__stop = th.Event()
+        self.__opened = th.Event()
+        self.__closed = False
+        self.__consoles = [_Console(config) for config in configs]
+        self.__error: Optional[BaseException] = None
+
+    def __exit__(self, __exc_type: type[BaseException] | None, __exc_value: BaseException | None, __traceback: TracebackType | None) -> bool | None:
+        self.close()
+        return None
+
+    def wait_for_pairing(self, timeout: float | None = None) -> bool:
+        """
+        すべてのポートを開き、すべてのコンソールのペアリングが完了するまで待機する
+
+        Returns:
+            bool: すべてのペアリングが完了していれば`True`
+
+        Raises:
+            Exception: ペアリングの前に子プロセスが終了した場合、子プロセスで発生した例外
+        """
+        # すべてのコンソールで1つの期限を共有する
+        deadline = None if timeout is None else monotonic() + timeout
+
+        def left() -> float:
+            return READ_TIMEOUT if deadline is None else min(READ_TIMEOUT, max(0, deadline - monotonic()))
+
+        def expired() -> bool:
+            return not deadline is None and deadline <= monotonic()
+
+        # 開く前に届いたデータは、ポートを開く際に破棄される
+        while not self.__opened.wait(left()):
+            if expired():
+                return False
+
+        for console in self.__consoles:
+            # ペアリングに失敗して終了した子プロセスを待ち続けないよう、短い間隔で確認する
+            while not console.is_paired.wait(left()):
+                if not console.process.is_alive():
+                    console.process.join()
+                    error = console.take_error()
+                    raise error if not error is None else RuntimeError(
+                        f"{console.config.port}: worker process exited before pairing")
+                if expired():
+                    return False
+        return True
+
+    def metrics(self) -> List[ConsoleMetrics]:
+        """
+        コンソールごとの統計値を取得する
+        """
+        return [console.metrics() for console in self.__consoles]
+
+    def run(self):
+        self.__logger.info(f"Start multiplexing {len(self.__consoles)} ports")
+        try:
+            for console in self.__consoles:
+                console.ser = Serial(console.config.port,
+                                     console.config.baudrate, timeout=0)
+            self.__opened.set()
+            if platform.system() == "Windows":
+                self.__run_threads()
+            else:
+                self.__run_selector()
+        except BaseException as e:
+            self.__error = e
+            self.__opened.set()
+        finally:
+            for console in self.__consoles:
+                if not console.ser is None:
+                    console.ser.close()
+        self.__logger.info("Multiplexing has been stopped")
+
+    def __run_selector(self):
+        r, w = os.pipe()
+        lock = th.Lock()
+        closed = False
+
+        def wake():
+            # 例外で読み出しが終了した場合も、スレッドを残さない
+            while not self.__stop.wait(READ_TIMEOUT):
+                if closed:
+                    return
+            with lock:
+                if not closed:
+                    os.write(w, b"\0")
+        th.Thread(target=wake, daemon=True).start()
+
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(r, selectors.EVENT_READ)
+                for console in self.__consoles:
+                    selector.register(console.ser.fileno(),
+                                      selectors.EVENT_READ, console)
+
+                while not self.__stop.is_set():
+                    for key, _ in selector.select():
+                        console: Optional[_Console] = key.data
+                        if console is None:
+                            continue
+                        data = console.ser.read(
+                            max(1, console.ser.in_waiting))
+                        if data != b"":
+                            console.write(data)
+                        if not console.alive:
+                            self.__logger.error(
+                                f"{console.config.port}: worker process is not alive")
+                            selector.unregister(key.fileobj)
+        finally:
+            with lock:
+                closed = True
+                os.close(r)
+                os.close(w)
+
+    def __run_threads(self):
+        # Windowsではシリアルポートをselectorsで監視できないため、ポートごとにスレッドを起動する
+        def read(console: _Console):
+            try:
+                for lines in read_batches(console.ser, ReadMode.Blocking, self.__stop):
+                    console.writelines(lines)
+                    if not console.alive:
+                        self.__logger.error(
+                            f"{console.config.port}: worker process is not alive")
+                        return
+            except BaseException as e:
+                self.__error = e
+                self.__stop.set()
+
+        threads = [th.Thread(target=read, args=(console,), daemon=True)
+                   for console in self.__consoles]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def close(self):
+        """
+        読み出しと子プロセスを停止し、終了を待機する
+
+        Raises:
+            Exception: 読み出し中、または子プロセスで発生した例外
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__stop.set()
+        if self.is_alive():
+            self.join()
+
+        print("shutdown connections...")
+        errors = [console.close() for console in self.__consoles]
+        error = next((e for e in [self.__error] + errors if not e is None), None)
+        if not error is None:
+            raise error
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from enum import Enum, auto
+import os
+import selectors
+import threading as th
+from typing import Callable, Iterator, List
+
+from serial import Serial
+
+from ..framing import LineFramer
+
+
+READ_TIMEOUT = 0.1
+"""
+`ReadMode.Blocking`で、停止要求を確認する間隔（秒）
+"""
+
+
+class ReadMode(Enum):
+    Poll = auto()
+    """
+    `timeout=0`で読み出しを繰り返す（CPUを1コア占有する）
+    """
+    Blocking = auto()
+    """
+    短いタイムアウト付きでデータの到着を待機する
+    """
+    Select = auto()
+    """
+    `selectors`でポートを監視し、停止要求はパイプで通知する（*nixのみ）
+    """
+
+
+def _batches(ser: Serial, cancel: th.Event, wait: Callable[[], bool]) -> Iterator[List[bytes]]:
+    framer = LineFramer()
+    while not cancel.is_set():
+        if not wait():
+            continue
+
+        # 到着済みのデータをまとめて読み出す。何も届いていなければ1バイト目の到着を待つ
+        data = ser.read(max(1, ser.in_waiting))
+        if data == b"":
+            continue
+
+        # 行末に達していないデータは、続きが届くまでframerが保持する
+        lines = framer.feed(data)
+        if len(lines) != 0:
+            yield lines
+
+
+def _select(ser: Serial, cancel: th.Event) -> Iterator[List[bytes]]:
+    r, w = os.pipe()
+    lock = th.Lock()
+    closed = False
+
+    def wake():
+        # 停止要求がないまま読み出しが終了した場合も、スレッドを残さない
+        while not cancel.wait(READ_TIMEOUT):
+            if closed:
+                return
+        with lock:
+            if not closed:
+                os.write(w, b"\0")
+    th.Thread(target=wake, daemon=True).start()
+
+    try:
+        with selectors.DefaultSelector() as selector:
+            selector.register(ser.fileno(), selectors.EVENT_READ)
+            selector.register(r, selectors.EVENT_READ)
+
+            def wait():
+                return any(key.fd != r for key, _ in selector.select())
+
+            yield from _batches(ser, cancel, wait)
+    finally:
+        with lock:
+            closed = True
+            os.close(r)
+            os.close(w)
+
+
+def read_batches(ser: Serial, mode: ReadMode, cancel: th.Event) -> Iterator[List[bytes]]:
+    """
+    停止要求があるまで、シリアルポートから受信済みの行をまとめて読み出す
+
+    `readline`は1バイトずつ読み出すため、到着済みのデータを一度に読み出してから行に分割する。
+
+    Args:
+        ser (Serial): 開いているシリアルポート
+        mode (ReadMode): 読み出し方式
+        cancel (th.Event): 停止用のイベントオブジェクト
+    """
+    if mode == ReadMode.Poll:
+        # シリアルポートはブロックせず、読み出すデータがなければすぐに空文字列を返す。
+        ser.timeout = 0
+        return _batches(ser, cancel, lambda: True)
+
+    if mode == ReadMode.Blocking:
+        ser.timeout = READ_TIMEOUT
+        return _batches(ser, cancel, lambda: True)
+
+    if mode == ReadMode.Select:
+        ser.timeout = 0
+        return _select(ser, cancel)
+
+    raise ValueError(f"unknown mode: {mode}")
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import List
+
+
+class LineFramer:
+    """
+    まとめて受信したデータを行単位に分割する
+
+    行末（`\\n`）に達していないデータは内部のバッファに保持し、続きのデータと合わせてから取り出す。
+    """
+
+    def __init__(self) -> None:
+        self.__buffer = bytearray()
+
+    @property
+    def pending(self) -> int:
+        """
+        行末に達していないデータのバイト数
+        """
+        return len(self.__buffer)
+
+    def feed(self, data: bytes | bytearray | memoryview) -> List[bytes]:
+        """
+        受信したデータを追加し、完成した行を取り出す
+
+        Args:
+            data (bytes | bytearray | memoryview): 受信したデータ
+
+        Returns:
+            List[bytes]: 行末を含む、完成した行のリスト
+        """
+        buffer = self.__buffer
+        buffer += data
+
+        end = buffer.find(b"\n")
+        if end < 0:
+            return []
+
+        lines: list[bytes] = []
+        start = 0
+        with memoryview(buffer) as view:
+            while 0 <= end:
+                lines.append(view[start:end + 1].tobytes())
+                start = end + 1
+                end = buffer.find(b"\n", start)
+        del buffer[:start]
+        return lines
+
+    def clear(self) -> None:
+        """
+        行末に達していないデータを破棄する
+        """
+        self.__buffer.clear()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from logging import DEBUG, NullHandler, getLogger
+from struct import Struct
+from threading import Event, Thread
+from time import perf_counter
+from typing import Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from typing_extensions import Protocol
+
+
+MOTION_DTYPE = np.dtype([("t", "<f8"), ("gyro", "<i2", (3,)), ("accel", "<i2", (3,))])
+"""
+モーションのサンプル（時刻（秒）、ジャイロ、加速度）
+"""
+
+_HEADER = Struct("<8sI")
+_MAGIC = b"PCMOTION"
+_VERSION = 1
+
+
+class MotionSink(Protocol):
+    def send_motion(self, gyro: Tuple[int, int, int], accel: Tuple[int, int, int]):
+        pass
+
+
+def _to_int16(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype.kind == "u":
+        # センサーから取得した符号なしの値は、2の補数として解釈しなおす
+        return values.astype(np.uint16).view(np.int16)
+    return np.clip(np.rint(values), -0x8000, 0x7FFF).astype(np.int16)
+
+
+def motion_samples(timestamps: Sequence[float] | np.ndarray, gyro: np.ndarray, accel: np.ndarray) -> np.ndarray:
+    """
+    時刻、ジャイロ、加速度の配列を`MOTION_DTYPE`の配列にまとめる
+
+    ジャイロと加速度は`(n, 3)`の配列で指定する。符号なし整数の配列は2の補数として、浮動小数点数の配列は丸めたうえで`int16`の範囲に収めて変換する。
+
+    Args:
+        timestamps (Sequence[float] | np.ndarray): 各サンプルの時刻（秒）
+        gyro (np.ndarray): ジャイロの値
+        accel (np.ndarray): 加速度の値
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    gyro = _to_int16(gyro)
+    accel = _to_int16(accel)
+    if gyro.shape != (len(timestamps), 3) or accel.shape != (len(timestamps), 3):
+        raise ValueError("gyro and accel must be arrays of shape (n, 3)")
+    if 1 < len(timestamps) and np.any(np.diff(timestamps) < 0):
+        raise ValueError("timestamps must be monotonically increasing")
+
+    samples = np.empty(len(timestamps), dtype=MOTION_DTYPE)
+    samples["t"] = timestamps
+    samples["gyro"] = gyro
+    samples["accel"] = accel
+    return samples
+
+
+def save_motion(path: str, samples: np.ndarray):
+    """
+    モーションのサンプルをファイルに保存する
+
+    ヘッダーに続いて、`MOTION_DTYPE`のレコードをそのまま書き込む。
+    """
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION))
+        np.asarray(samples, dtype=MOTION_DTYPE).tofile(f)
+
+
+def load_motion(path: str) -> np.ndarray:
+    """
+    `save_motion`で保存したファイルを読み込む
+    """
+    with open(path, "rb") as f:
+        magic, version = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a motion file")
+        return np.fromfile(f, dtype=MOTION_DTYPE)
+
+
+Samples = Union[np.ndarray, Iterable[Tuple[float,
+                                           Tuple[int, int, int], Tuple[int, int, int]]]]
+
+
+def _iterate(samples: Samples) -> Iterator[Tuple[float, Tuple[int, int, int], Tuple[int, int, int]]]:
+    if isinstance(samples, np.ndarray):
+        samples = np.asarray(samples, dtype=MOTION_DTYPE)
+        # tolistでまとめてPythonのintに変換しておく
+        return zip(samples["t"].tolist(), map(tuple, samples["gyro"].tolist()), map(tuple, samples["accel"].tolist()))
+    return iter(samples)
+
+
+class MotionStream(Thread):
+    """
+    モーションのサンプルを再生するスレッド
+    """
+
+    def __init__(self, sink: MotionSink, samples: Samples, speed: float = 1.0, max_lateness: float = 0.05, spin: float = 0.002, handle: Optional[Event] = None):
+        """
+        モーションのサンプルを再生するスレッド
+
+        - 開始時刻からの経過時間でサンプルごとの送信時刻を求めるため、誤差が累積しない
+        - `max_lateness`秒以上遅れたサンプルは送信せずに読み飛ばす
+
+        Args:
+            sink (MotionSink): 送信先（`Session`）
+            samples (Samples): `MOTION_DTYPE`の配列、または`(時刻, ジャイロ, 加速度)`のイテレーター
+            speed (float, optional): 再生速度。Defaults to 1.0.
+            max_lateness (float, optional): 読み飛ばすまでの遅れ（秒）。Defaults to 0.05.
+            spin (float, optional): ビジーウェイトで待機する時間（秒）。Defaults to 0.002.
+            handle (Optional[Event], optional): 中断用フラグ。Defaults to None（インスタンスごとに作成する）.
+        """
+        super().__init__()
+
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+
+        self.__logger = getLogger(__name__)
+        self.__logger.addHandler(NullHandler())
+        self.__logger.setLevel(DEBUG)
+        self.__logger.propagate = True
+
+        self.__sink = sink
+        self.__samples = samples
+        self.__speed = speed
+        self.__max_lateness = max_lateness
+        self.__spin = spin
+        self.__handle = Event() if handle is None else handle
+
+        self.__sent = 0
+        self.__dropped = 0
+
+    @property
+    def handle(self) -> Event:
+        """
+        中断用フラグ（省略した場合はインスタンスごとに作成したもの）
+        """
+        return self.__handle
+
+    @property
+    def sent(self) -> int:
+        return self.__sent
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    def stop(self):
+        """
+        再生を中断する（`handle`をセットする）
+        """
+        self.__handle.set()
+
+    def run(self):
+        self.__logger.info("Start streaming")
+
+        start_time = perf_counter()
+        first = None
+        for t, gyro, accel in _iterate(self.__samples):
+            if self.__handle.is_set():
+                break
+
+            if first is None:
+                first = t
+            at = start_time + (t - first) / self.__speed
+
+            left = at - perf_counter()
+            if left < -self.__max_lateness:
+                self.__dropped += 1
+                continue
+            if self.__spin < left and self.__handle.wait(left - self.__spin):
+                break
+            # 端数をビジーウェイトで待機する
+            while perf_counter() < at:
+                pass
+
+            self.__sink.send_motion(gyro, accel)
+            self.__sent += 1
+
+        self.__logger.info(
+            f"Streaming has been stopped by {'handle' if self.__handle.is_set() else 'end of samples'}")
+        self.__logger.info(f"sent: {self.__sent}, dropped: {self.__dropped}")
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from threading import Event, Lock, Thread
+from typing import Callable, List, Optional
+
+
+class PairingMonitor(Thread):
+    """
+    ペアリングの完了を監視するスレッド
+    """
+
+    def __init__(self, is_paired: Callable[[], bool], interval: float = 0.05):
+        """
+        ペアリングの完了を監視するスレッド
+
+        `is_paired`を短い間隔で呼び出し、ペアリングが完了したらイベントをセットして、登録されたコールバックを呼び出す。
+
+        Args:
+            is_paired (Callable[[], bool]): ペアリングの状態を取得する関数
+            interval (float, optional): 状態を確認する間隔（秒）。Defaults to 0.05.
+        """
+        super().__init__(daemon=True)
+
+        self.__is_paired = is_paired
+        self.__interval = interval
+        self.__paired = Event()
+        self.__stopped = Event()
+        self.__callbacks: List[Callable[[], None]] = []
+        self.__lock = Lock()
+
+    def run(self):
+        while not self.__is_paired():
+            if self.__stopped.wait(self.__interval):
+                return
+
+        with self.__lock:
+            self.__paired.set()
+            callbacks = list(self.__callbacks)
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """
+        ペアリングの完了時に呼び出す関数を登録する
+
+        すでにペアリングが完了している場合は、直ちに呼び出す。
+        """
+        with self.__lock:
+            if not self.__paired.is_set():
+                self.__callbacks.append(callback)
+                return
+        callback()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        ペアリングの完了を待機する
+
+        Returns:
+            bool: ペアリングが完了していれば`True`
+        """
+        return self.__paired.wait(timeout)
+
+    def stop(self):
+        """
+        監視を中止する
+        """
+        self.__stopped.set()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from heapq import heappop, heappush
+from itertools import count
+from threading import Condition, Thread
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+from .state import RawState
+
+
+class Scheduler(Thread):
+    """
+    指定した時刻に入力状態を送信するスレッド
+    """
+
+    def __init__(self, dispatch: Callable[[RawState], None], spin: float = 0.02):
+        """
+        指定した時刻に入力状態を送信するスレッド
+
+        - 時刻は`time.perf_counter()`を基準とする（プロセス間で共通）
+        - 時刻の直前まではスリープし、端数をビジーウェイトで待機する
+        - 同じ時刻の入力は、登録した順に送信する
+
+        Args:
+            dispatch (Callable[[RawState], None]): 入力状態を送信する関数
+            spin (float, optional): ビジーウェイトで待機する時間（秒）。Defaults to 0.02.
+        """
+        super().__init__(daemon=True)
+
+        self.__dispatch = dispatch
+        self.__spin = spin
+        self.__queue: List[Tuple[float, int, RawState]] = []
+        self.__counter = count()
+        self.__condition = Condition()
+        self.__stopped = False
+
+    def run(self):
+        while True:
+            with self.__condition:
+                while not self.__stopped and len(self.__queue) == 0:
+                    self.__condition.wait()
+                if self.__stopped:
+                    return
+
+                at = self.__queue[0][0]
+                left = at - perf_counter()
+                if self.__spin < left:
+                    # 待機中により早い入力が登録された場合に備えて、先頭を確認しなおす
+                    self.__condition.wait(left - self.__spin)
+                    continue
+
+            # 端数をビジーウェイトで待機する
+            while perf_counter() < at:
+                pass
+
+            with self.__condition:
+                due: list[RawState] = []
+                now = perf_counter()
+                while len(self.__queue) != 0 and self.__queue[0][0] <= now:
+                    due.append(heappop(self.__queue)[2])
+
+            for state in due:
+                self.__dispatch(state)
+
+    def schedule(self, at: float, state: RawState):
+        """
+        入力状態の送信を予約する
+
+        Args:
+            at (float): 送信する時刻（`time.perf_counter()`基準）
+            state (RawState): 送信する入力状態
+        """
+        with self.__condition:
+            heappush(self.__queue, (at, next(self.__counter), state))
+            self.__condition.notify()
+
+    def clear(self):
+        """
+        予約をすべて取り消す
+        """
+        with self.__condition:
+            self.__queue.clear()
+            self.__condition.notify()
+
+    def stop(self):
+        """
+        予約を破棄して、スレッドを終了する
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__queue.clear()
+            self.__condition.notify()
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
 from contextlib import AbstractContextManager
-from time import perf_counter, sleep
+from threading import Lock
+from time import perf_counter, perf_counter_ns
 from types import TracebackType
+from typing import Callable, Optional
 
 from pydantic import BaseModel, validator
 
-from .btkeyLib import start, is_paired, send_button, send_stick_l, send_stick_r, shutdown
-from .state import State
+from .btkeyLib import start, is_paired, send_state, shutdown
+from .pairing import PairingMonitor
+from .scheduler import Scheduler
+from .state import NEUTRAL, RawState, decode
+from .trace import TraceSink
 
 
 class ControllerColor(BaseModel):
@@ -52,16 +57,31 @@ class Session(AbstractContextManager):
     # 3. __del__ ... タイミングは指示できないが、必ず呼ばれる
     #
 
-    def __init__(self, pairing_timeout=30, controller_color=ControllerColor()) -> None:
+    def __init__(self, pairing_timeout=30, controller_color=ControllerColor(), trace: Optional[TraceSink] = None) -> None:
+        """
+        Args:
+            pairing_timeout (int, optional): ペアリングの最大待機秒数。Defaults to 30.
+            controller_color (ControllerColor, optional): コントローラーの配色。Defaults to ControllerColor().
+            trace (Optional[TraceSink], optional): `dispatch`された入力状態を時刻とともに記録する`TraceWriter`／`TraceBuffer`。Defaults to None.
+        """
         start(controller_color.pad, controller_color.button,
               controller_color.leftgrip, controller_color.rightgrip)
-        start_time = perf_counter()
-        while not is_paired() and perf_counter() < start_time + pairing_timeout:
-            sleep(1)
-        if not is_paired():
+        self.__monitor = PairingMonitor(is_paired)
+        self.__monitor.start()
+        if not self.__monitor.wait(pairing_timeout):
             print("pairing timeout")
         self.__closed = False
 
+        # 直前に送信した値（Noneは未送信）
+        self.__buttons: int | None = None
+        self.__stick_l: tuple[int, int] | None = None
+        self.__stick_r: tuple[int, int] | None = None
+        self.__suppressed = 0
+        self.__lock = Lock()
+        self.__trace = trace
+
+        self.__scheduler: Scheduler | None = None
+
     def __enter__(self):
         return self
 
@@ -75,16 +95,133 @@ class Session(AbstractContextManager):
     def close(self):
         if self.__closed:
             return
+        self.__monitor.stop()
+        # 停止を待機する間にスケジューラーのスレッドがdispatchできるよう、ロックの外で停止する
+        with self.__lock:
+            scheduler = self.__scheduler
+        if not scheduler is None:
+            scheduler.stop()
         shutdown()
         self.__closed = True
 
     def is_paired(self) -> bool:
         return is_paired()
 
+    def on_paired(self, callback: Callable[[], None]):
+        """
+        ペアリングの完了時に呼び出す関数を登録する
+
+        すでにペアリングが完了している場合は、直ちに呼び出す。
+        """
+        self.__monitor.add_callback(callback)
+
+    def wait_for_pairing(self, timeout: Optional[float] = None) -> bool:
+        """
+        ペアリングの完了を待機する
+
+        Returns:
+            bool: ペアリングが完了していれば`True`
+        """
+        return self.__monitor.wait(timeout)
+
+    @property
+    def suppressed(self) -> int:
+        """
+        直前と同じ値だったため、送信を省略した呼び出しの回数
+        """
+        return self.__suppressed
+
     def send(self, data: bytes):
-        state = State.from_bytes(data)
-        send_button(state.buttons.value)
-        if not state.sticks.l is None:
-            send_stick_l(state.sticks.l.x, state.sticks.l.y)
-        if not state.sticks.r is None:
-            send_stick_r(state.sticks.r.x, state.sticks.r.y)
+        self.dispatch(decode(data))
+
+    def dispatch(self, state: RawState):
+        """
+        入力状態を送信する
+
+        直前に送信した値と変化のない項目は、btkeyLibを呼び出さない（記録には残す）。
+
+        Args:
+            state (RawState): 送信する入力状態
+        """
+        with self.__lock:
+            if not self.__trace is None:
+                self.__trace.record(perf_counter_ns(), state)
+            self.__dispatch(state)
+
+    def __dispatch(self, state: RawState):
+        buttons = None
+        if state.buttons != self.__buttons:
+            buttons = self.__buttons = state.buttons
+        else:
+            self.__suppressed += 1
+
+        stick_l = None
+        if not state.l is None:
+            if state.l != self.__stick_l:
+                stick_l = self.__stick_l = state.l
+            else:
+                self.__suppressed += 1
+
+        stick_r = None
+        if not state.r is None:
+            if state.r != self.__stick_r:
+                stick_r = self.__stick_r = state.r
+            else:
+                self.__suppressed += 1
+
+        # 変化した項目だけを、まとめて送信する
+        if buttons is None and stick_l is None and stick_r is None:
+            return
+        send_state(buttons, stick_l, stick_r)
+
+    def send_motion(self, gyro: tuple[int, int, int], accel: tuple[int, int, int]):
+        """
+        ジャイロと加速度の値を送信する（実験的機能）
+
+        Args:
+            gyro (tuple[int, int, int]): ジャイロの値（符号付き16bit）
+            accel (tuple[int, int, int]): 加速度の値（符号付き16bit）
+        """
+        with self.__lock:
+            send_state(gyro=gyro, accel=accel)
+
+    def schedule(self, at: float, state: RawState | bytes):
+        """
+        指定した時刻に入力状態を送信する
+
+        シリアル通信の到着時刻に左右されず、専用のスレッドから送信する。
+
+        Args:
+            at (float): 送信する時刻（`time.perf_counter()`基準）
+            state (RawState | bytes): 送信する入力状態、またはPokeConから送られる1行分のデータ
+        """
+        if not isinstance(state, RawState):
+            state = decode(state)
+        # 複数のスレッドから同時に呼び出されても、スケジューラーは1つだけ作成する
+        with self.__lock:
+            if self.__scheduler is None:
+                self.__scheduler = Scheduler(self.dispatch)
+                self.__scheduler.start()
+            scheduler = self.__scheduler
+        scheduler.schedule(at, state)
+
+    def press(self, state: RawState | bytes, duration: float, at: float | None = None):
+        """
+        指定した時刻から`duration`秒間入力し、すべての入力を解除する
+
+        Args:
+            state (RawState | bytes): 入力状態、またはPokeConから送られる1行分のデータ
+            duration (float): 入力の継続時間（秒）
+            at (float | None, optional): 入力を開始する時刻（`time.perf_counter()`基準）。Defaults to None（直ちに開始する）.
+        """
+        if at is None:
+            at = perf_counter()
+        self.schedule(at, state)
+        self.schedule(at + duration, NEUTRAL)
+
+    def cancel_scheduled(self):
+        """
+        送信していない予約をすべて取り消す
+        """
+        if not self.__scheduler is None:
+            self.__scheduler.clear()
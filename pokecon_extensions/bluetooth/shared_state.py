@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from struct import Struct
+from time import perf_counter, sleep
+from typing import List, NamedTuple, Optional, Tuple
+
+from typing_extensions import Protocol
+
+from .state import NEUTRAL, RawState
+
+
+# seq | paired | body | ring (seq | body) * CAPACITY
+# body: buttons | time | stick_l (x, y) | stick_r (x, y) | gyro (x, y, z) | accel (x, y, z)
+_SEQ = Struct("<Q")
+_PAIRED = Struct("<I")
+_BODY = Struct("<Id4H3h3h")
+_PAIRED_OFFSET = _SEQ.size
+_BODY_OFFSET = _PAIRED_OFFSET + _PAIRED.size
+_RING_OFFSET = _BODY_OFFSET + _BODY.size
+_SLOT_SIZE = _SEQ.size + _BODY.size
+
+CAPACITY = 4096
+"""
+読み出し側が取りこぼさずに追いつける更新の数
+"""
+SIZE = _RING_OFFSET + _SLOT_SIZE * CAPACITY
+"""
+共有メモリのバイト数
+"""
+
+_SPIN = 1000
+READ_TIMEOUT = 1.0
+"""
+書き込みの完了を待機する最大秒数（書き込み側のプロセスが書き込みの途中で終了した場合に使用する）
+"""
+
+
+class Doorbell(Protocol):
+    """
+    `threading.Event`／`multiprocessing.Event`
+    """
+
+    def set(self):
+        pass
+
+
+class Snapshot(NamedTuple):
+    seq: int
+    """
+    更新のたびに2ずつ増える通し番号
+    """
+    time: float
+    """
+    更新された時刻（`time.perf_counter()`基準）
+    """
+    state: RawState
+    """
+    入力状態（スティックは常に値を持つ）
+    """
+    gyro: Tuple[int, int, int]
+    accel: Tuple[int, int, int]
+
+
+class SharedState:
+    """
+    共有メモリ上に置いたコントローラーの入力状態
+
+    - 書き込みは1つのプロセスからのみおこなう
+    - seqlockにより、読み出し側はロックせずに最新の状態を取得できる（複数のプロセスから読み出せる）
+    - 直近`CAPACITY`回の更新をリングバッファにも残すため、`updates`で押して離すような短い入力も順に読み出せる
+    - 行のテキストを経由しないため、更新の頻度によらず一定の時間で読み書きできる
+
+    Pythonからはメモリバリアを挿入できないため、seqlockの正しさはCPUがストアとロードの順序を保つこと（x86/x64）を前提とする。
+    Apple SiliconなどのARMでは、ごくまれに書き込み途中の値を読み出す可能性がある。
+    """
+
+    def __init__(self, name: Optional[str] = None, create: bool = False, doorbell: Optional[Doorbell] = None) -> None:
+        """
+        Args:
+            name (Optional[str], optional): 共有メモリの名前。作成時に省略すると自動で決まる。Defaults to None.
+            create (bool, optional): 共有メモリを作成する。Defaults to False（既存の共有メモリに接続する）.
+            doorbell (Optional[Doorbell], optional): 書き込みのたびにセットするイベント。Defaults to None.
+        """
+        if create:
+            self.__shm = shared_memory.SharedMemory(name, create=True, size=SIZE)
+        else:
+            if name is None:
+                raise ValueError("name is required to attach")
+            # 接続しただけのプロセスが終了時に共有メモリを削除しないようにする（Python 3.13以降）
+            # それ以前は、作成したプロセスと無関係なプロセスから接続すると、終了時に削除されてしまう（接続済みのプロセスは読み出しを続けられる）
+            # https://bugs.python.org/issue39959
+            try:
+                self.__shm = shared_memory.SharedMemory(name, track=False)
+            except TypeError:
+                self.__shm = shared_memory.SharedMemory(name)
+        self.__owner = create
+        self.__buffer = self.__shm.buf
+        self.__doorbell = doorbell
+
+        # 書き込み側が保持する現在の値
+        self.__seq = 0
+        # 読み出し側で、リングバッファが上書きされて取りこぼした更新の数
+        self.__lost = 0
+        self.__state = NEUTRAL
+        self.__gyro = (0, 0, 0)
+        self.__accel = (0, 0, 0)
+        if create:
+            self.__publish()
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+    def close(self):
+        """
+        共有メモリから切断する。作成したプロセスの場合は削除する
+        """
+        if self.__buffer is None:
+            return
+        self.__buffer.release()
+        self.__buffer = None
+        self.__shm.close()
+        if self.__owner:
+            self.__shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    @property
+    def lost(self) -> int:
+        """
+        `updates`の呼び出しが遅れ、リングバッファから失われた更新の数
+        """
+        return self.__lost
+
+    def __publish(self):
+        buffer = self.__buffer
+        state = self.__state
+        seq = self.__seq
+        body = (state.buttons, perf_counter(),
+                state.l[0], state.l[1], state.r[0], state.r[1],
+                *self.__gyro, *self.__accel)
+        slot = _slot_offset(seq + 2)
+
+        _SEQ.pack_into(buffer, 0, seq + 1)  # 奇数の間は書き込み中
+        _BODY.pack_into(buffer, _BODY_OFFSET, *body)
+        _SEQ.pack_into(buffer, slot, seq + 1)
+        _BODY.pack_into(buffer, slot + _SEQ.size, *body)
+        _SEQ.pack_into(buffer, slot, seq + 2)
+        _SEQ.pack_into(buffer, 0, seq + 2)
+        self.__seq = seq + 2
+
+        if not self.__doorbell is None:
+            self.__doorbell.set()
+
+    def dispatch(self, state: RawState):
+        """
+        入力状態を書き込む（`Session.dispatch`と同じ引数）
+
+        更新されないスティックは、前回の値を引き継ぐ。
+        """
+        current = self.__state
+        if state.l is None or state.r is None:
+            state = RawState(state.buttons,
+                             current.l if state.l is None else state.l,
+                             current.r if state.r is None else state.r)
+        self.__state = state
+        self.__publish()
+
+    def send_motion(self, gyro: Tuple[int, int, int], accel: Tuple[int, int, int]):
+        """
+        ジャイロと加速度の値を書き込む（`Session.send_motion`と同じ引数）
+        """
+        self.__gyro = tuple(gyro)
+        self.__accel = tuple(accel)
+        self.__publish()
+
+    def is_paired(self) -> bool:
+        return _PAIRED.unpack_from(self.__buffer, _PAIRED_OFFSET)[0] != 0
+
+    def set_paired(self, paired: bool):
+        """
+        ペアリングの状態を書き込む（読み出し側のBluetooth接続をおこなうプロセスが使用する）
+        """
+        _PAIRED.pack_into(self.__buffer, _PAIRED_OFFSET, 1 if paired else 0)
+
+    def read(self, timeout: float = READ_TIMEOUT) -> Snapshot:
+        """
+        最新の状態を読み出す
+
+        書き込み中の場合は、書き込みが完了するまで読み出しなおす。
+
+        Raises:
+            TimeoutError: `timeout`秒以内に書き込みが完了しなかった場合（書き込み側のプロセスが異常終了した場合など）
+        """
+        snapshot = _read_at(self.__buffer, 0, None, timeout)
+        assert not snapshot is None
+        return snapshot
+
+    def updates(self, after: int, timeout: float = READ_TIMEOUT) -> List[Snapshot]:
+        """
+        通し番号が`after`より新しい更新を、古い順にすべて読み出す
+
+        直近`CAPACITY`回より古い更新は失われているため、失われた数を`lost`に加算し、残っている更新から読み出す。
+
+        Raises:
+            TimeoutError: `timeout`秒以内に書き込みが完了しなかった場合
+        """
+        buffer = self.__buffer
+        latest = self.seq() & ~1  # 書き込み中の更新は含めない
+        oldest = max(after + 2, latest - 2 * (CAPACITY - 1))
+        if after + 2 < oldest:
+            self.__lost += (oldest - after - 2) // 2
+
+        snapshots: List[Snapshot] = []
+        for seq in range(oldest, latest + 1, 2):
+            snapshot = _read_at(buffer, _slot_offset(seq), seq, timeout)
+            if snapshot is None:
+                # 読み出す前に上書きされた場合は、最新の状態で補う
+                self.__lost += (latest - seq) // 2
+                snapshots.append(self.read(timeout))
+                break
+            snapshots.append(snapshot)
+        return snapshots
+
+    def seq(self) -> int:
+        """
+        最新の通し番号を取得する（変化の有無を確認するために使用する）
+        """
+        return _SEQ.unpack_from(self.__buffer, 0)[0]
+
+
+def _slot_offset(seq: int) -> int:
+    return _RING_OFFSET + _SLOT_SIZE * (seq // 2 % CAPACITY)
+
+
+def _read_at(buffer: memoryview, offset: int, expected: Optional[int], timeout: float) -> Optional[Snapshot]:
+    # `expected`を指定した場合は、その通し番号の更新が上書きされていれば`None`を返す
+    deadline: Optional[float] = None
+    spins = 0
+    while True:
+        seq = _SEQ.unpack_from(buffer, offset)[0]
+        if not expected is None and expected < seq:
+            return None
+        if not seq & 1:
+            buttons, time, lx, ly, rx, ry, gx, gy, gz, ax, ay, az = _BODY.unpack_from(
+                buffer, offset + _SEQ.size)
+            if _SEQ.unpack_from(buffer, offset)[0] == seq:
+                return Snapshot(seq, time, RawState(buttons, (lx, ly), (rx, ry)), (gx, gy, gz), (ax, ay, az))
+
+        # 書き込みは数マイクロ秒で終わるため、しばらくは待機せずに読みなおす
+        spins += 1
+        if spins < _SPIN:
+            continue
+        if deadline is None:
+            deadline = perf_counter() + timeout
+        elif deadline < perf_counter():
+            raise TimeoutError("writer did not finish updating shared state")
+        sleep(0.001)
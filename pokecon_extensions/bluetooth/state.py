@@ -2,9 +2,7 @@ from __future__ import annotations
 
 from enum import IntEnum, IntFlag, auto
 from functools import reduce
-from typing import Optional
-
-from pydantic import BaseModel, validator
+from typing import NamedTuple, Optional, Tuple
 
 
 class Button(IntFlag):
@@ -75,63 +73,189 @@ TABLE_HAT = {
 }
 
 
-class Stick(BaseModel):
-    x: int
-    y: int
+AXIS_X = tuple(i << 4 for i in range(0x100))
+"""
+8bitの横軸の値に対応する12bitの値
+"""
+AXIS_Y = tuple(0xFFF - (i << 4) for i in range(0x100))
+"""
+8bitの縦軸の値に対応する12bitの値（上下を反転する）
+"""
+
+
+def _check_axis(axis: int):
+    if not (0x0 <= axis <= 0xFF):
+        raise ValueError("axis must be between 0 and 255")
+
+
+class Stick:
+    """
+    スティックの値（12bit）
+
+    生成のたびに実行されるため、pydanticのモデルではなく`__slots__`を使用する。
+    """
+    __slots__ = ("x", "y")
+
+    def __init__(self, x: int, y: int) -> None:
+        """
+        Args:
+            x (int): 横軸の値（8bit）
+            y (int): 縦軸の値（8bit）
+
+        Raises:
+            ValueError: 値が0-255の範囲外の場合
+        """
+        _check_axis(x)
+        _check_axis(y)
+        self.x = AXIS_X[x]
+        self.y = AXIS_Y[y]
+
+    @classmethod
+    def from_raw(cls, x: int, y: int) -> Stick:
+        """
+        12bitに変換済みの値から、検証せずに構築する
+        """
+        stick = cls.__new__(cls)
+        stick.x = x
+        stick.y = y
+        return stick
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Stick):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    def __repr__(self) -> str:
+        return f"Stick(x={self.x}, y={self.y})"
+
+
+class Sticks:
+    __slots__ = ("l", "r")
+
+    def __init__(self, l: Optional[Stick] = None, r: Optional[Stick] = None) -> None:
+        self.l = l
+        self.r = r
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sticks):
+            return NotImplemented
+        return self.l == other.l and self.r == other.r
 
-    @validator("x")
-    def x_axis_must_be_between_0_255(cls, axis: int):
-        assert 0x0 <= axis and axis <= 0xff
-        return int(axis / 0x100 * 0x1000)
+    def __repr__(self) -> str:
+        return f"Sticks(l={self.l!r}, r={self.r!r})"
 
-    @validator("y")
-    def y_axis_must_be_between_0_255(cls, axis: int):
-        assert 0x0 <= axis and axis <= 0xff
-        return 0xFFF - int(axis / 0x100 * 0x1000)
 
+class RawState(NamedTuple):
+    """
+    デコード済みの入力状態
 
-class Sticks(BaseModel):
-    l: Optional[Stick] = None  # | は不可（3.7だから？）
-    r: Optional[Stick] = None
+    pydanticのモデルを経由しない軽量な表現で、`Session`への受け渡しに使用する。
+    スティックの値は`btkeyLib`にそのまま渡せる12bitの値で、更新しない場合は`None`。
+    """
+    buttons: int
+    l: Optional[Tuple[int, int]]
+    r: Optional[Tuple[int, int]]
 
 
-def _from_bytes(data: bytes) -> State:
-    line = data.decode("ascii").replace("\r\n", "").split(" ")
-    if not (
-        line[0] == "end" or
-        line[0].startswith("0x")
-    ):
+def _button_table(shift: int) -> Tuple[int, ...]:
+    # 1byte分のビット列に対応するボタンのビットマスクを、全256通りあらかじめ求めておく
+    return tuple(reduce(lambda a, b: a | b, [
+        t[1].value for t in TABLE_BUTTON.items() if (i << shift) & t[0]], 0) for i in range(0x100))
+
+
+_BUTTON_LOW = _button_table(0)
+_BUTTON_HIGH = _button_table(8)
+_HAT = tuple(TABLE_HAT[i].value for i in range(len(TABLE_HAT)))
+_PADDING = (b"0",) * 6
+
+NEUTRAL = RawState(0, (0x800, 0x7FF), (0x800, 0x7FF))
+"""
+すべてのボタンを離し、スティックを中央に戻した状態
+"""
+
+
+def decode(data: bytes | bytearray) -> RawState:
+    """
+    PokeConから送られる1行分のデータを`RawState`に変換する
+
+    文字列への変換やモデルの構築を行わないため、`State.from_bytes`より高速に動作する。
+
+    Args:
+        data (bytes | bytearray): 1行分のデータ（改行の有無は問わない）
+
+    Raises:
+        ValueError: データの形式が不正な場合
+    """
+    line = data.split()
+    if len(line) == 0 or not (line[0] == b"end" or line[0].startswith(b"0x")):
         raise ValueError('data must start with "end" or "0x"')
 
-    if line[0] == "end":
-        return State()  # ボタンも全部離すけどたぶん大丈夫
+    if line[0] == b"end":
+        return NEUTRAL  # ボタンも全部離すけどたぶん大丈夫
 
-    if 6 < len(line) or len(line) < 2:
+    n = len(line)
+    if 6 < n or n < 2:
         raise ValueError(
             "maximum number of elements in data is 6, minimum is 2")
 
-    line.extend(["0"] * (6 - len(line)))  # 要素数が6になるように0でパディング
+    if n < 6:
+        line.extend(_PADDING[n:])  # 要素数が6になるように0でパディング
 
     try:
         btns, hat, lx, ly, rx, ry = [int(val, 16) for val in line]
-    except:
+    except ValueError:
         raise ValueError('elements must be numeric')
 
-    # 含まれるボタンの配列をorでまとめる
-    buttons = reduce(lambda a, b: a | b, [
-                     t[1] for t in TABLE_BUTTON.items() if btns & t[0]], Button(0)) | TABLE_HAT[hat]
+    if not (0 <= btns and 0 <= hat < len(_HAT)):
+        raise ValueError("invalid buttons or hat")
+
+    buttons = _BUTTON_LOW[btns & 0xFF] | _BUTTON_HIGH[(btns >> 8) & 0xFF] | _HAT[hat]
+
     # btnsの下位2bitで更新を判定する
-    sticks = Sticks(l=Stick(x=lx, y=ly) if bool(btns & 0b10) else None,
-                    r=Stick(x=rx, y=ry) if bool(btns & 0b01) else None)
+    l = None
+    if btns & 0b10:
+        if not (0 <= lx <= 0xFF and 0 <= ly <= 0xFF):
+            raise ValueError("axis must be between 0 and 255")
+        l = (AXIS_X[lx], AXIS_Y[ly])
+    r = None
+    if btns & 0b01:
+        if not (0 <= rx <= 0xFF and 0 <= ry <= 0xFF):
+            raise ValueError("axis must be between 0 and 255")
+        r = (AXIS_X[rx], AXIS_Y[ry])
+
+    return RawState(buttons, l, r)
+
 
-    return State(buttons=buttons, sticks=sticks)
+class State:
+    """
+    検証済みの入力状態
+    """
+    __slots__ = ("buttons", "sticks")
 
+    def __init__(self, buttons: Button | int = Button(0), sticks: Optional[Sticks] = None) -> None:
+        self.buttons = Button(buttons)
+        self.sticks = Sticks(l=Stick(x=128, y=128), r=Stick(x=128, y=128)) if sticks is None else sticks
 
-class State(BaseModel):
-    buttons: Button = Button(0)
-    sticks: Sticks = Sticks(
-        l=Stick(changed=True, x=128, y=128), r=Stick(changed=True, x=128, y=128))
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, State):
+            return NotImplemented
+        return self.buttons == other.buttons and self.sticks == other.sticks
+
+    def __repr__(self) -> str:
+        return f"State(buttons={self.buttons!r}, sticks={self.sticks!r})"
 
     @classmethod
     def from_bytes(cls, data: bytes) -> State:
-        return _from_bytes(data)
+        """
+        PokeConから送られる1行分のデータを、検証済みの`State`として取得する
+
+        送信処理では`decode`を使用しており、このメソッドは確認用のビューとしてのみ使用する。
+        """
+        return cls.from_raw(decode(data))
+
+    @classmethod
+    def from_raw(cls, raw: RawState) -> State:
+        # 12bitに変換済みの値なので、検証せずに構築する
+        return cls(buttons=raw.buttons, sticks=Sticks(
+            l=None if raw.l is None else Stick.from_raw(*raw.l),
+            r=None if raw.r is None else Stick.from_raw(*raw.r)))
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from contextlib import AbstractContextManager, nullcontext
+import os
+from struct import Struct
+from time import perf_counter
+from types import TracebackType
+from typing import TYPE_CHECKING, BinaryIO, ContextManager, Iterable, List, NamedTuple, Optional
+
+from typing_extensions import Protocol
+
+from .state import RawState
+
+if TYPE_CHECKING:
+    from .session import Session
+
+
+_HEADER = Struct("<8sI")
+_MAGIC = b"PCTRACE\0"
+_VERSION = 1
+
+# 時刻（ns） | フラグ | ボタン | 左スティック (x, y) | 右スティック (x, y)
+_RECORD = Struct("<qII4H")
+_STICK_L = 0b01
+_STICK_R = 0b10
+
+
+class TraceRecord(NamedTuple):
+    time: int
+    """
+    `Session.dispatch`が呼び出された時刻（`time.perf_counter_ns()`基準）
+    """
+    state: RawState
+
+
+class TraceSink(Protocol):
+    """
+    記録先（`TraceWriter`／`TraceBuffer`）
+    """
+
+    def record(self, time: int, state: RawState):
+        pass
+
+
+def _pack_into(buffer: bytearray | memoryview, offset: int, time: int, state: RawState):
+    flags = 0
+    lx = ly = rx = ry = 0
+    if not state.l is None:
+        flags |= _STICK_L
+        lx, ly = state.l
+    if not state.r is None:
+        flags |= _STICK_R
+        rx, ry = state.r
+    _RECORD.pack_into(buffer, offset, time, flags,
+                      state.buttons, lx, ly, rx, ry)
+
+
+def pack_records(records: Iterable[TraceRecord]) -> bytes:
+    """
+    記録をトレースファイルと同じ形式のバイト列に変換する（ヘッダーは含まない）
+    """
+    records = list(records)
+    buffer = bytearray(len(records) * _RECORD.size)
+    for i, (time, state) in enumerate(records):
+        _pack_into(buffer, i * _RECORD.size, time, state)
+    return bytes(buffer)
+
+
+def unpack_records(data: bytes | bytearray | memoryview) -> List[TraceRecord]:
+    """
+    `pack_records`で変換したバイト列を記録に戻す
+    """
+    return [TraceRecord(time, RawState(buttons,
+                                       (lx, ly) if flags & _STICK_L else None,
+                                       (rx, ry) if flags & _STICK_R else None))
+            for time, flags, buttons, lx, ly, rx, ry in _RECORD.iter_unpack(data)]
+
+
+def _write_header(f: BinaryIO):
+    f.write(_HEADER.pack(_MAGIC, _VERSION))
+
+
+def _read_header(f: BinaryIO, path: str):
+    magic, version = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError(f"{path} is not a trace file")
+
+
+class TraceWriter(AbstractContextManager):
+    """
+    ファイルの末尾に記録を追記する
+
+    テキストではなく1件24バイトの固定長で書き込む。書き込みはバッファリングされ、`flush`／`close`でファイルに反映される。
+    """
+
+    def __init__(self, path: str, buffering: int = 64 * 1024) -> None:
+        """
+        Args:
+            path (str): 記録するファイルのパス。既存のファイルには追記する
+            buffering (int, optional): 書き込みのバッファのバイト数。Defaults to 64 * 1024.
+        """
+        exists = os.path.exists(path) and 0 < os.path.getsize(path)
+        if exists:
+            with open(path, "rb") as f:
+                _read_header(f, path)
+        self.__file = open(path, "ab", buffering=buffering)
+        if not exists:
+            _write_header(self.__file)
+        self.__record = bytearray(_RECORD.size)
+
+    def __exit__(self, __exc_type: type[BaseException] | None, __exc_value: BaseException | None, __traceback: TracebackType | None) -> bool | None:
+        self.close()
+        return None
+
+    def record(self, time: int, state: RawState):
+        _pack_into(self.__record, 0, time, state)
+        self.__file.write(self.__record)
+
+    def flush(self):
+        self.__file.flush()
+
+    def close(self):
+        self.__file.close()
+
+
+def open_trace(path: str) -> ContextManager[Optional[TraceWriter]]:
+    """
+    `path`が空文字列でなければ`TraceWriter`を開く（`Config.trace`で使用する）
+    """
+    return TraceWriter(path) if path else nullcontext()
+
+
+class TraceBuffer:
+    """
+    直近の`capacity`件だけを保持するリングバッファ
+
+    あらかじめ確保したメモリに上書きするため、記録してもメモリの確保は発生しない。
+    """
+
+    def __init__(self, capacity: int = 65536) -> None:
+        """
+        Args:
+            capacity (int, optional): 保持する件数。Defaults to 65536.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.__capacity = capacity
+        self.__buffer = bytearray(capacity * _RECORD.size)
+        self.__next = 0
+        self.__count = 0
+
+    def __len__(self) -> int:
+        return min(self.__count, self.__capacity)
+
+    @property
+    def dropped(self) -> int:
+        """
+        上書きされた件数
+        """
+        return max(0, self.__count - self.__capacity)
+
+    def record(self, time: int, state: RawState):
+        _pack_into(self.__buffer, self.__next * _RECORD.size, time, state)
+        self.__next = (self.__next + 1) % self.__capacity
+        self.__count += 1
+
+    def records(self) -> List[TraceRecord]:
+        """
+        保持している記録を古い順に取得する
+        """
+        view = memoryview(self.__buffer)
+        if self.__count <= self.__capacity:
+            return unpack_records(view[:self.__count * _RECORD.size])
+        split = self.__next * _RECORD.size
+        return unpack_records(view[split:]) + unpack_records(view[:split])
+
+    def save(self, path: str):
+        """
+        保持している記録を`read_trace`で読み込めるファイルに保存する
+        """
+        with open(path, "wb") as f:
+            _write_header(f)
+            view = memoryview(self.__buffer)
+            if self.__count <= self.__capacity:
+                f.write(view[:self.__count * _RECORD.size])
+            else:
+                split = self.__next * _RECORD.size
+                f.write(view[split:])
+                f.write(view[:split])
+
+
+def read_trace(path: str) -> List[TraceRecord]:
+    """
+    `TraceWriter`／`TraceBuffer.save`で保存したファイルを読み込む
+
+    書き込み途中で終了したなどで末尾が欠けている場合、その記録は読み飛ばす。
+    """
+    with open(path, "rb") as f:
+        _read_header(f, path)
+        data = f.read()
+    return unpack_records(memoryview(data)[:len(data) - len(data) % _RECORD.size])
+
+
+def replay(records: Iterable[TraceRecord], session: Session, speed: float = 1.0, at: Optional[float] = None) -> float:
+    """
+    記録した入力状態を、記録時と同じ間隔で`Session`から送信する
+
+    すべての記録を`Session.schedule`で予約するため、呼び出しはすぐに戻る。中断するには`Session.cancel_scheduled`を呼び出す。
+
+    Args:
+        records (Iterable[TraceRecord]): `read_trace`／`TraceBuffer.records`で取得した記録
+        session (Session): 送信に使用する`Session`
+        speed (float, optional): 再生速度。Defaults to 1.0.
+        at (Optional[float], optional): 最初の記録を送信する時刻（`time.perf_counter()`基準）。Defaults to None（直ちに開始する）.
+
+    Returns:
+        float: 最後の記録を送信する時刻（`time.perf_counter()`基準）
+    """
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    if at is None:
+        at = perf_counter()
+
+    end = at
+    first = None
+    for time, state in records:
+        if first is None:
+            first = time
+        end = at + (time - first) / 1e9 / speed
+        session.schedule(end, state)
+    return end
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from logging import DEBUG, NullHandler, getLogger
+from threading import Condition, Event, Thread
+from time import perf_counter_ns
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class Frame(NamedTuple):
+    seq: int
+    """
+    取得した順の通し番号（0から始まる）
+    """
+    time: int
+    """
+    取得した時刻（`time.perf_counter_ns()`基準）
+    """
+    image: np.ndarray
+    """
+    リングバッファ内の配列（コピーではない）
+    """
+
+
+class FrameHub(Thread):
+    """
+    VideoCaptureからの取得を1つのスレッドにまとめ、取得したフレームを複数の利用者に配るスレッド
+    """
+
+    def __init__(self, capture: cv2.VideoCapture, slots: int = 8, handle: Optional[Event] = None) -> None:
+        """
+        VideoCaptureからの取得を1つのスレッドにまとめ、取得したフレームを複数の利用者に配るスレッド
+
+        - あらかじめ確保した`slots`枚の配列に順に読み込むため、取得のたびに配列を確保しない
+        - 利用者は`latest`／`wait`でフレームを参照し、必要な場合だけコピーする。参照した配列は`slots - 1`枚先のフレームを取得するまで上書きされない
+        - VideoCaptureと同じように使える`reader`を、PokeConのカメラと置き換えて使用できる（`share`）
+
+        Args:
+            capture (cv2.VideoCapture): 呼び出し元のPythonCommandが保持するVideoCaptureのインスタンス（`self.camera.camera`）
+            slots (int, optional): リングバッファの枚数。Defaults to 8.
+            handle (Optional[Event], optional): 中断用フラグ。Defaults to None（インスタンスごとに作成する）.
+        """
+        super().__init__(daemon=True)
+
+        self.__logger = getLogger(__name__)
+        self.__logger.addHandler(NullHandler())
+        self.__logger.setLevel(DEBUG)
+        self.__logger.propagate = True
+
+        if not capture.isOpened():
+            raise RuntimeError("capture is not opened")
+        if slots < 2:
+            raise ValueError("slots must be at least 2")
+
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width <= 0 or height <= 0:
+            raise ValueError("width and height must be a positive integer")
+
+        self.__capture = capture
+        self.__ring = np.zeros((slots, height, width, 3), dtype=np.uint8)
+        self.__slots = slots
+        self.__handle = Event() if handle is None else handle
+        self.__condition = Condition()
+        self.__latest: Optional[Frame] = None
+        self.__stopped = False
+        self.__stop_callbacks: List[Callable[[], None]] = []
+
+    @property
+    def capture(self) -> cv2.VideoCapture:
+        return self.__capture
+
+    @property
+    def stopped(self) -> bool:
+        return self.__stopped
+
+    def run(self):
+        self.__logger.info("Start capturing")
+
+        seq = 0
+        try:
+            while not self.__handle.is_set():
+                if not self.__capture.isOpened():
+                    self.__logger.error("Capture is closed")
+                    break
+
+                slot = self.__ring[seq % self.__slots]
+                ret, image = self.__capture.read(slot)
+                if not ret:
+                    self.__logger.error("Failed to get frame")
+                    continue
+
+                # 大きさが変わった場合などは、VideoCaptureが新しい配列を返す
+                frame = Frame(seq, perf_counter_ns(), image)
+                with self.__condition:
+                    self.__latest = frame
+                    self.__condition.notify_all()
+                seq += 1
+        finally:
+            with self.__condition:
+                self.__stopped = True
+                self.__condition.notify_all()
+                callbacks = list(self.__stop_callbacks)
+            for callback in callbacks:
+                callback()
+
+            self.__logger.info(
+                f"Capturing has been stopped by {'handle' if self.__handle.is_set() else 'unknown'}")
+            self.__logger.info(f"captured: {seq}")
+
+    def latest(self) -> Optional[Frame]:
+        """
+        最新のフレームを取得する（まだ取得していなければ`None`）
+        """
+        return self.__latest
+
+    def wait(self, after: int = -1, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        通し番号が`after`より新しいフレームを取得するまで待機する
+
+        Returns:
+            Optional[Frame]: 最新のフレーム。タイムアウトした場合や、停止した場合は`None`
+        """
+        with self.__condition:
+            self.__condition.wait_for(lambda: self.__stopped or (
+                not self.__latest is None and after < self.__latest.seq), timeout)
+            latest = self.__latest
+            if latest is None or latest.seq <= after:
+                return None
+            return latest
+
+    def is_valid(self, frame: Frame) -> bool:
+        """
+        フレームの配列がまだ上書きされていないかを確認する
+
+        コピーした後に確認すれば、コピーの途中で上書きされていないことを保証できる。
+        """
+        latest = self.__latest
+        # 最新の次のフレームは、すでに読み込みが始まっている
+        return latest is None or latest.seq + 1 < frame.seq + self.__slots
+
+    def reader(self, copy: bool = True) -> HubReader:
+        """
+        VideoCaptureの代わりに使用できる読み出し口を作成する
+        """
+        return HubReader(self, copy)
+
+    @contextmanager
+    def share(self, camera: Any) -> Iterator[None]:
+        """
+        PokeConのカメラ（`self.camera`）が保持するVideoCaptureを`reader`に置き換える
+
+        プレビューや`isContainTemplate`も、このスレッドが取得したフレームを参照するようになる。
+        このスレッドが停止した場合は、ブロックの途中でも元のVideoCaptureに戻す（プレビューが停止しない）。
+        """
+        original = camera.camera
+        # 元に戻すまでの間に読み出された場合も、直前のフレームを返す
+        reader = HubReader(self, hold_last=True)
+
+        def restore():
+            if camera.camera is reader:
+                camera.camera = original
+
+        camera.camera = reader
+        with self.__condition:
+            stopped = self.__stopped
+            if not stopped:
+                self.__stop_callbacks.append(restore)
+        if stopped:
+            restore()
+        try:
+            yield
+        finally:
+            with self.__condition:
+                if restore in self.__stop_callbacks:
+                    self.__stop_callbacks.remove(restore)
+            restore()
+
+
+class HubReader:
+    """
+    `FrameHub`のフレームを、VideoCaptureと同じ`read`で読み出す
+
+    `read`は前回より新しいフレームが届くまで待機する。`release`してもVideoCaptureは解放しない（`FrameHub`が保持する）。
+    """
+
+    def __init__(self, hub: FrameHub, copy: bool = True, hold_last: bool = False) -> None:
+        """
+        Args:
+            hub (FrameHub): 読み出し元
+            copy (bool, optional): フレームをコピーして返す。`False`の場合はリングバッファ内の配列をそのまま返す。Defaults to True.
+            hold_last (bool, optional): `FrameHub`が停止した後の`read`で、失敗の代わりに直前のフレームのコピーを返す（PokeConのプレビュー向け）。Defaults to False.
+        """
+        self.__hub = hub
+        self.__copy = copy
+        self.__hold_last = hold_last
+        self.__last: Optional[Frame] = None
+        self.__released = False
+
+    @property
+    def last(self) -> Optional[Frame]:
+        """
+        直前に読み出したフレーム
+        """
+        return self.__last
+
+    def isOpened(self) -> bool:
+        return not self.__released and not self.__hub.stopped and self.__hub.capture.isOpened()
+
+    def get(self, prop: int) -> float:
+        return self.__hub.capture.get(prop)
+
+    def set(self, prop: int, value: float) -> bool:
+        return self.__hub.capture.set(prop, value)
+
+    def release(self):
+        self.__released = True
+
+    def read_frame(self, image: Optional[np.ndarray] = None, timeout: Optional[float] = None) -> Optional[Frame]:
+        """
+        前回より新しいフレームを、通し番号と時刻とともに読み出す
+
+        Args:
+            image (Optional[np.ndarray], optional): 同じ大きさの配列を指定した場合は、その配列にコピーする。Defaults to None.
+            timeout (Optional[float], optional): 待機する秒数。Defaults to None.
+
+        Returns:
+            Optional[Frame]: フレーム。停止した場合やタイムアウトした場合は`None`
+        """
+        after = -1 if self.__last is None else self.__last.seq
+        while True:
+            frame = self.__hub.wait(after, timeout)
+            if frame is None:
+                return None
+
+            if not image is None and image.shape == frame.image.shape:
+                image[...] = frame.image
+                frame = frame._replace(image=image)
+            elif self.__copy:
+                frame = frame._replace(image=frame.image.copy())
+            else:
+                break
+            # コピーの途中で上書きされた場合は、最新のフレームで読み直す
+            if self.__hub.is_valid(frame):
+                break
+
+        self.__last = frame
+        return frame
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        frame = self.read_frame(image)
+        if frame is None:
+            last = self.__last
+            if self.__hold_last and not last is None:
+                return True, last.image.copy()
+            return False, None
+        return True, frame.image
@@ -0,0 +1,5 @@
+from .channel import Backpressure, Channel, ChannelClosed
+from .filter import apply_filters, Filter, inplace
+from .instant_replay import InstantReplayRecorder
+from .recorder import Recorder
+from .vfr import read_timestamps, restore_cfr, TimestampWriter, write_timecodes
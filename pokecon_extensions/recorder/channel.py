@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from collections import deque
+from enum import Enum, auto
+from threading import Condition
+from typing import Deque, Generic, List, Optional, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class Backpressure(Enum):
+    """
+    `Channel`が満杯のときの動作
+    """
+    Block = auto()
+    """
+    空きができるまで待機する（取り出す側が追いつくまで、追加する側が止まる）
+    """
+    DropOldest = auto()
+    """
+    最も古い項目を破棄して追加する（破棄した項目のフレーム数は、次に古い項目に引き継ぐ）
+    """
+    DuplicateLast = auto()
+    """
+    追加しようとした項目を破棄し、最後の項目のフレーム数に加算する（直前のフレームを繰り返して辻褄を合わせる）
+    """
+
+
+class ChannelClosed(Exception):
+    pass
+
+
+class Channel(Generic[T]):
+    """
+    スレッド間で`(項目, フレーム数)`を受け渡す、上限付きのキュー
+
+    フレーム数は同じ項目を何回書き込むかを表し、項目を破棄する場合も合計は保たれるため、再生速度が変わらない。
+    """
+
+    def __init__(self, maxsize: int = 8, backpressure: Backpressure = Backpressure.Block) -> None:
+        """
+        Args:
+            maxsize (int, optional): 保持する項目の上限。Defaults to 8.
+            backpressure (Backpressure, optional): 満杯のときの動作。Defaults to Backpressure.Block.
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+
+        self.__items: Deque[List] = deque()
+        self.__maxsize = maxsize
+        self.__backpressure = backpressure
+        self.__condition = Condition()
+        self.__closed = False
+        self.__dropped = 0
+
+    @property
+    def dropped(self) -> int:
+        """
+        満杯のため破棄した項目の数
+        """
+        return self.__dropped
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def put(self, item: T, count: int = 1):
+        """
+        項目を追加する
+
+        Raises:
+            ChannelClosed: `close`の後に呼び出した場合
+        """
+        with self.__condition:
+            items = self.__items
+            if self.__maxsize <= len(items):
+                if self.__backpressure == Backpressure.Block:
+                    self.__condition.wait_for(
+                        lambda: len(items) < self.__maxsize or self.__closed)
+                elif self.__backpressure == Backpressure.DropOldest:
+                    _, dropped = items.popleft()
+                    if len(items) != 0:
+                        items[0][1] += dropped
+                    else:
+                        count += dropped
+                    self.__dropped += 1
+                else:
+                    items[-1][1] += count
+                    self.__dropped += 1
+                    return
+            if self.__closed:
+                raise ChannelClosed()
+
+            # フレーム数を書き換えるため、リストで保持する
+            items.append([item, count])
+            self.__condition.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[T, int]]:
+        """
+        最も古い項目を取り出す
+
+        Returns:
+            Optional[Tuple[T, int]]: 項目とフレーム数。タイムアウトした場合は`None`
+
+        Raises:
+            ChannelClosed: `close`の後、すべての項目を取り出した場合
+        """
+        with self.__condition:
+            items = self.__items
+            if not self.__condition.wait_for(lambda: len(items) != 0 or self.__closed, timeout):
+                return None
+            if len(items) == 0:
+                raise ChannelClosed()
+            item, count = items.popleft()
+            self.__condition.notify_all()
+            return item, count
+
+    def close(self):
+        """
+        これ以上追加しないことを通知する（追加済みの項目は取り出せる）
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
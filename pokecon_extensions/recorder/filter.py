@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from typing import Callable, List, Optional, TypeVar
+
+import cv2
+
+
+Filter = Callable[[cv2.Mat], Optional[cv2.Mat]]
+F = TypeVar("F", bound=Filter)
+
+
+def inplace(filter: F) -> F:
+    """
+    入力の配列を直接書き換えるフィルターであることを宣言する
+
+    宣言したフィルターには、コピーせずに配列を渡す。入力の配列を後で参照するために保持してはならない。
+    戻り値が`None`の場合は、書き換えた入力の配列をそのまま使用する。
+
+    ```
+    @inplace
+    def current_time(frame: cv2.Mat):
+        cv2.putText(frame, str(datetime.now()), ...)
+        return frame
+    ```
+    """
+    setattr(filter, "inplace", True)
+    return filter
+
+
+def is_inplace(filter: Filter) -> bool:
+    return getattr(filter, "inplace", False) is True
+
+
+def apply_filters(frame: cv2.Mat, filters: List[Filter]) -> cv2.Mat:
+    """
+    フィルターを順に適用する
+
+    `frame`は書き換えられる可能性がある。`inplace`を宣言していないフィルターは入力を保持するかもしれないため、コピーを渡す。
+    """
+    for filter in filters:
+        if is_inplace(filter):
+            result = filter(frame)
+            if not result is None:
+                frame = result
+        else:
+            frame = filter(frame.copy())
+    return frame
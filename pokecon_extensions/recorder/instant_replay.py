@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from collections import deque
+from datetime import datetime
+from logging import DEBUG, NullHandler, getLogger
+import math
+from os import makedirs, path
+import re
+from threading import Event, Thread
+from time import perf_counter_ns
+from typing import Deque, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..frame_hub import FrameHub, HubReader
+from .filter import apply_filters, Filter
+from .vfr import cfr_indices
+
+
+def _filename_at(time: datetime):
+    filename = f"{time}.mp4"
+    # from https://stackoverflow.com/questions/295135/turn-a-string-into-a-valid-filename
+    s = str(filename).strip().replace(" ", "_")
+    s = re.sub(r"(?u)[^-\w.]", "", s)
+    return s
+
+
+class InstantReplayRecorder(Thread):
+    """
+    直近の映像をメモリに保持し、トリガーがセットされた場合だけ前後の映像を保存するスレッド
+    """
+
+    def __init__(
+        self,
+        capture: cv2.VideoCapture | FrameHub,
+        fps: int,
+        trigger: Event,
+        pre_roll: float = 60,
+        post_roll: float = 5,
+        directory: str = "Captures",
+        filters: list[Filter] = [],
+        quality: Optional[int] = 90,
+        handle: Optional[Event] = None
+    ) -> None:
+        """
+        直近の映像をメモリに保持し、トリガーがセットされた場合だけ前後の映像を保存するスレッド
+
+        - 普段は取得と（`quality`を指定した場合は）JPEGへの圧縮だけをおこない、mp4への書き込みやフィルターは保存するときにだけ実行する
+        - 保持するフレーム数は`(pre_roll + post_roll) * fps`で固定のため、長時間動かしてもメモリ使用量は増えない
+        - トリガーは保存を始めるときにクリアする。保存中にセットされたトリガーは、次の保存として扱う
+
+        Args:
+            capture (cv2.VideoCapture | FrameHub): 呼び出し元のPythonCommandが保持するVideoCaptureのインスタンス（`self.camera.camera`）、または`FrameHub`
+            fps (int): 呼び出し元のPythonCommandが保持するfps（`self.camera.fps`）
+            trigger (Event): 保存用フラグ
+            pre_roll (float, optional): トリガーより前に保存する秒数。Defaults to 60.
+            post_roll (float, optional): トリガーより後に保存する秒数。Defaults to 5.
+            directory (str, optional): 保存先のフォルダ。トリガーがセットされた時刻をファイル名として保存する。Defaults to "Captures".
+            filters (list[Filter], optional): 保存する映像に適用するフィルター。Defaults to `[]`.
+            quality (Optional[int], optional): JPEGの品質（0-100）。`None`の場合は圧縮せずに保持する（1280x720で1フレームあたり約2.8MB）。Defaults to 90.
+            handle (Optional[Event], optional): 中断用フラグ。Defaults to None（インスタンスごとに作成する）.
+        """
+        super().__init__()
+
+        self.__logger = getLogger(__name__)
+        self.__logger.addHandler(NullHandler())
+        self.__logger.setLevel(DEBUG)
+        self.__logger.propagate = True
+
+        if not path.exists(directory):
+            makedirs(directory)
+
+        # 圧縮する場合は、FrameHubの配列を直接読み出す（上書きされていないかは圧縮した後に確認する）
+        self.__hub = capture if isinstance(capture, FrameHub) else None
+        self.__capture = capture.reader(copy=quality is None) if isinstance(
+            capture, FrameHub) else capture
+        if not self.__capture.isOpened():
+            raise RuntimeError("capture is not opened")
+
+        if fps <= 0:
+            raise ValueError("fps must be a positive integer")
+        if pre_roll < 0 or post_roll < 0 or pre_roll + post_roll <= 0:
+            raise ValueError("pre_roll and post_roll must not be negative")
+        if not quality is None and not 0 <= quality <= 100:
+            raise ValueError("quality must be between 0 and 100")
+
+        self.__fps = fps
+        self.__trigger = trigger
+        self.__pre_roll = pre_roll
+        self.__post_roll = post_roll
+        self.__directory = directory
+        self.__filters = filters
+        self.__quality = quality
+        self.__handle = Event() if handle is None else handle
+
+        # (取得時刻, フレーム)。圧縮した場合、フレームはJPEGのバイト列
+        self.__ring: Deque[Tuple[int, np.ndarray]] = deque(
+            maxlen=math.ceil((pre_roll + post_roll) * fps) + 1)
+        self.__encoders: List[Thread] = []
+        self.__saved: List[str] = []
+
+    @property
+    def saved(self) -> List[str]:
+        """
+        保存したファイル名
+        """
+        return list(self.__saved)
+
+    @property
+    def buffered(self) -> int:
+        """
+        メモリに保持しているフレームのバイト数
+        """
+        return sum(frame.nbytes for _, frame in list(self.__ring))
+
+    def run(self):
+        self.__logger.info("Start buffering")
+
+        # 保存待ちのトリガーの(時刻, 日時)
+        pending: Optional[Tuple[int, datetime]] = None
+        try:
+            while not self.__handle.is_set():
+
+                if not self.__capture.isOpened():
+                    self.__logger.error("Capture is closed")
+                    break
+
+                if pending is None and self.__trigger.is_set():
+                    self.__trigger.clear()
+                    pending = perf_counter_ns(), datetime.now()
+                    self.__logger.info("Triggered")
+
+                ret, frame = self.__capture.read()
+                if not ret:
+                    self.__logger.error("Failed to get frame")
+                    continue
+                self.__store(frame)
+
+                # 圧縮に失敗した場合などは、まだ1枚も保持していない可能性がある
+                ring = self.__ring
+                if not pending is None and len(ring) != 0 and pending[0] + self.__post_roll * 1e9 <= ring[-1][0]:
+                    self.__save(*pending)
+                    pending = None
+        finally:
+            # 中断された場合は、それまでの映像を保存する
+            if not pending is None:
+                self.__save(*pending)
+            for encoder in self.__encoders:
+                encoder.join()
+
+            self.__logger.info(
+                f"Buffering has been stopped by {'handle' if self.__handle.is_set() else 'unknown'}")
+            self.__logger.info(f"saved: {len(self.__saved)}")
+
+    def __store(self, frame: np.ndarray):
+        # FrameHubの場合は、カメラから取得した時刻を使用する
+        last = self.__capture.last if isinstance(
+            self.__capture, HubReader) else None
+        time = perf_counter_ns() if last is None else last.time
+
+        if self.__quality is None:
+            # read()は毎回新しい配列を返すため、コピーせずに保持する
+            self.__ring.append((time, frame))
+            return
+
+        ret, data = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.__quality])
+        if not ret:
+            self.__logger.error("Failed to encode frame")
+            return
+        if not self.__hub is None and not last is None and not self.__hub.is_valid(last):
+            # 圧縮の途中で上書きされた場合は破棄する
+            return
+        self.__ring.append((time, data))
+
+    def __save(self, time: int, triggered_at: datetime):
+        start = time - int(self.__pre_roll * 1e9)
+        frames = [item for item in self.__ring if start <= item[0]]
+        if len(frames) == 0:
+            return
+
+        filename = path.join(self.__directory, _filename_at(triggered_at))
+        # 書き込みは別のスレッドで実行し、その間も取得を続ける
+        encoder = Thread(target=self.__encode, args=(
+            filename, frames), name="InstantReplayRecorder-encode")
+        encoder.start()
+        self.__encoders = [e for e in self.__encoders if e.is_alive()]
+        self.__encoders.append(encoder)
+
+    def __encode(self, filename: str, frames: List[Tuple[int, np.ndarray]]):
+        self.__logger.info(f"Saving {len(frames)} frames to {filename}")
+
+        writer: Optional[cv2.VideoWriter] = None
+        try:
+            times = np.array([time for time, _ in frames], dtype=np.int64)
+            index = -1
+            image = None
+            for source in cfr_indices(times, self.__fps).tolist():
+                if index != source:
+                    index = source
+                    # 圧縮していない配列は次の保存でも参照するため、書き換えないようにコピーする
+                    image = frames[index][1].copy() if self.__quality is None else cv2.imdecode(
+                        frames[index][1], cv2.IMREAD_COLOR)
+                    image = apply_filters(image, self.__filters)
+
+                if writer is None:
+                    height, width, _ = image.shape
+                    writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(
+                        *"mp4v"), self.__fps, (width, height))
+                    if not writer.isOpened():
+                        self.__logger.error("Writer is closed")
+                        return
+                writer.write(image)
+
+            self.__saved.append(filename)
+            self.__logger.info(f"Saved {filename}")
+        except BaseException as e:
+            self.__logger.error(f"{e!r}")
+        finally:
+            if not writer is None:
+                writer.release()
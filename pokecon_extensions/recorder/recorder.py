@@ -0,0 +1,285 @@
+from __future__ import annotations
+from datetime import datetime
+from logging import DEBUG, NullHandler, getLogger
+import math
+from os import makedirs, path
+import re
+from threading import Event, Thread
+from time import perf_counter, perf_counter_ns
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from ..frame_hub import FrameHub, HubReader
+from .channel import Backpressure, Channel, ChannelClosed
+from .filter import apply_filters, Filter
+from .vfr import TimestampWriter, timestamps_path
+
+
+_GET_TIMEOUT = 0.1
+
+
+def _filename_now():
+    filename = f"{datetime.now()}.mp4"
+    # from https://stackoverflow.com/questions/295135/turn-a-string-into-a-valid-filename
+    s = str(filename).strip().replace(" ", "_")
+    s = re.sub(r"(?u)[^-\w.]", "", s)
+    return s
+
+
+class Recorder(Thread):
+    """
+    画面を録画するスレッド
+    """
+
+    def __init__(
+        self,
+        capture: cv2.VideoCapture | FrameHub,
+        fps: int,
+        filename: str = path.join("Captures", _filename_now()),
+        filters: list[Filter] = [],
+        handle: Event = Event(),
+        backpressure: Backpressure = Backpressure.Block,
+        maxsize: int = 8,
+        vfr: bool = False
+    ) -> None:
+        """
+        画面を録画するスレッド
+
+        取得、フィルター、書き込みはそれぞれ別のスレッドで実行し、上限付きのキューで受け渡す。OpenCVの処理中はGILが解放されるため、重いフィルターや書き込みが取得を妨げない。
+
+        Args:
+            capture (cv2.VideoCapture | FrameHub): 呼び出し元のPythonCommandが保持するVideoCaptureのインスタンス（`self.camera.camera`）、または`FrameHub`（ほかの利用者とフレームを奪い合わない）
+            fps (int): 呼び出し元のPythonCommandが保持するfps（`self.camera.fps`）
+            filename (str, optional): 保存ファイル名。省略された場合、`./Captures/`以下に、現在時刻をファイル名として保存します。
+            filters (list[Filter], optional): 映像に適用するフィルター。入力を直接書き換えるフィルターは`inplace`で宣言するとコピーを省略できる。Defaults to `[]`.
+            handle (Event, optional): 中断用フラグ。Defaults to `Event()`.
+            backpressure (Backpressure, optional): キューが満杯のときの動作。Defaults to Backpressure.Block.
+            maxsize (int, optional): 各キューに保持するフレームの上限。Defaults to 8.
+            vfr (bool, optional): 可変フレームレートで録画する。取得したフレームを1回ずつ書き込み、取得時刻を`<filename>.timestamps`に記録する。一定のフレームレートの動画は`restore_cfr`で作成する。Defaults to False.
+        """
+        super().__init__()
+
+        self.__logger = getLogger(__name__)
+        self.__logger.addHandler(NullHandler())
+        self.__logger.setLevel(DEBUG)
+        self.__logger.propagate = True
+
+        if not path.exists(path.dirname(filename)):
+            makedirs(path.dirname(filename))
+
+        # FrameHubの配列は上書きされるため、コピーを受け取る（フィルターが書き換えられるようにする）
+        self.__capture = capture.reader() if isinstance(
+            capture, FrameHub) else capture
+        if not self.__capture.isOpened():
+            raise RuntimeError("capture is not opened")
+
+        # カメラの取得サイズ
+        width = int(self.__capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.__capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width <= 0 or height <= 0:
+            raise ValueError("width and height must be a positive integer")
+
+        if fps <= 0:
+            raise ValueError("fps must be a positive integer")
+
+        _, ext = path.splitext(filename)
+        if ext != ".mp4":
+            raise ValueError("currently only mp4 is supported")
+        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
+
+        # フィルター適用後のサイズ
+        mat = apply_filters(
+            np.zeros((height, width, 3), dtype=np.uint8), filters)
+        height, width, _ = mat.shape
+        if width <= 0 or height <= 0:
+            raise ValueError(
+                "width and height (after filter applied) must be a positive integer")
+        size = width, height
+
+        self.__writer_args = filename, fourcc, fps, size
+        self.__timestamps = timestamps_path(filename) if vfr else None
+        self.__filters = filters
+        self.__handle = handle
+
+        # 取得 -> フィルター -> 書き込み
+        # 項目は(フレーム, 取得時刻)
+        self.__filter_queue: Channel[Tuple[np.ndarray, int]] = Channel(
+            maxsize, backpressure)
+        self.__write_queue: Channel[Tuple[np.ndarray, int]] = Channel(
+            maxsize, backpressure)
+        self.__error: Optional[BaseException] = None
+        self.__drop_count = 0
+        self.__write_count = 0
+
+    @property
+    def drop_count(self) -> int:
+        """
+        取得が間に合わず、直前のフレームで補ったフレーム数（可変フレームレートでは補わないため、常に0）
+        """
+        return self.__drop_count
+
+    @property
+    def write_count(self) -> int:
+        """
+        書き込んだフレーム数
+        """
+        return self.__write_count
+
+    def run(self):
+        self.__logger.info("Start recording")
+
+        stages = [Thread(target=self.__filter, name="Recorder-filter"),
+                  Thread(target=self.__write, name="Recorder-write")]
+        for stage in stages:
+            stage.start()
+
+        try:
+            self.__capture_frames()
+        except BaseException as e:
+            self.__fail(e)
+        finally:
+            # キューに残ったフレームを書き込んでから終了する
+            self.__filter_queue.close()
+            for stage in stages:
+                stage.join()
+
+            self.__logger.info(
+                f"Recording has been stopped by {'handle' if self.__handle.is_set() else 'unknown'}")
+            if not self.__error is None:
+                self.__logger.error(f"{self.__error!r}")
+            self.__logger.info(f"drop_count: {self.__drop_count}")
+            self.__logger.info(
+                f"queue dropped: {self.__filter_queue.dropped} (filter), {self.__write_queue.dropped} (write)")
+
+    def __fail(self, e: BaseException):
+        if self.__error is None:
+            self.__error = e
+        # 待機中のスレッドを解放し、すべての段を停止する
+        self.__filter_queue.close()
+        self.__write_queue.close()
+
+    def __capture_frames(self):
+        if not self.__timestamps is None:
+            self.__capture_unique_frames()
+            return
+
+        fps = self.__writer_args[2]
+        interval = 1 / fps
+        start_time = perf_counter()  # 開始時刻
+        capture_count = 0  # 取得したフレーム数（補ったフレームを含む）
+
+        while not self.__handle.is_set():
+
+            if not self.__capture.isOpened():
+                self.__logger.error("Capture is closed")
+                return
+
+            ret, frame = self.__capture.read()
+            if not ret:
+                self.__logger.error("Failed to get frame")
+                continue
+
+            # 再生速度補正
+            # 参考: https://it-style.jp/?p=766
+            estimated_elapsed = capture_count * interval
+            actual_elapsed = perf_counter() - start_time
+            diff = actual_elapsed - estimated_elapsed
+            if 0 <= diff:
+                increase = math.ceil(diff / interval)  # 何フレーム書き込むか
+                if 1 < increase:
+                    # 取得が遅れている場合
+                    # 同じフレーム画像を繰り返し書き込み、辻褄を合わせる。
+                    # self.__logger.warning(f"frame dropped! copy {increase - 1} frames to make it up")
+                    self.__drop_count += increase - 1
+            else:
+                # self.__logger.info(f"get a frame too quickly, no need to write")
+                continue
+
+            # read()は毎回新しい配列を返すため、コピーせずに渡す
+            try:
+                self.__filter_queue.put((frame, 0), increase)
+            except ChannelClosed:
+                # 後段が停止した場合
+                return
+            capture_count += increase
+
+    def __capture_unique_frames(self):
+        # 可変フレームレートでは補正しない（取得が遅れた区間は、タイムスタンプの間隔が広がる）
+        while not self.__handle.is_set():
+
+            if not self.__capture.isOpened():
+                self.__logger.error("Capture is closed")
+                return
+
+            ret, frame = self.__capture.read()
+            if not ret:
+                self.__logger.error("Failed to get frame")
+                continue
+
+            # FrameHubの場合は、カメラから取得した時刻を使用する
+            last = self.__capture.last if isinstance(
+                self.__capture, HubReader) else None
+            time = perf_counter_ns() if last is None else last.time
+
+            try:
+                self.__filter_queue.put((frame, time))
+            except ChannelClosed:
+                return
+
+    def __filter(self):
+        try:
+            while True:
+                item = self.__filter_queue.get(_GET_TIMEOUT)
+                if item is None:
+                    continue
+                (frame, time), count = item
+
+                # 補うフレームも同じ画像なので、フィルターは1回だけ適用し、書き込む回数を渡す
+                # 取得した配列はこのスレッドだけが参照するため、コピーせずに書き換える
+                self.__write_queue.put((apply_filters(
+                    frame, self.__filters), time), count)
+
+        except ChannelClosed:
+            pass
+        except BaseException as e:
+            self.__fail(e)
+        finally:
+            self.__write_queue.close()
+
+    def __write(self):
+        writer = cv2.VideoWriter(*self.__writer_args)
+        timestamps = None if self.__timestamps is None else TimestampWriter(
+            self.__timestamps)
+        try:
+            while True:
+                if not writer.isOpened():
+                    self.__logger.error("Writer is closed")
+                    self.__fail(RuntimeError("writer is closed"))
+                    return
+
+                item = self.__write_queue.get(_GET_TIMEOUT)
+                if item is None:
+                    continue
+                (frame, time), count = item
+
+                if not timestamps is None:
+                    # キューが満杯で破棄したフレームは、書き込まずに取得時刻の間隔で表す
+                    writer.write(frame)
+                    timestamps.write(time)
+                    self.__write_count += 1
+                    continue
+
+                for _ in range(count):
+                    writer.write(frame)
+                self.__write_count += count
+
+        except ChannelClosed:
+            pass
+        except BaseException as e:
+            self.__fail(e)
+        finally:
+            writer.release()
+            if not timestamps is None:
+                timestamps.close()
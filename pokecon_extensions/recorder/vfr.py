@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from contextlib import AbstractContextManager
+from os import path
+from struct import Struct
+from types import TracebackType
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+_HEADER = Struct("<8sI")
+_MAGIC = b"PCFRAMES"
+_VERSION = 1
+_TIMESTAMP = Struct("<q")
+
+SUFFIX = ".timestamps"
+"""
+動画のファイル名に付けるタイムスタンプのファイルの拡張子
+"""
+
+
+def timestamps_path(video: str) -> str:
+    return video + SUFFIX
+
+
+class TimestampWriter(AbstractContextManager):
+    """
+    フレームごとの取得時刻（`time.perf_counter_ns()`基準）を、1件8バイトで書き込む
+    """
+
+    def __init__(self, path: str) -> None:
+        self.__file = open(path, "wb")
+        self.__file.write(_HEADER.pack(_MAGIC, _VERSION))
+
+    def __exit__(self, __exc_type: type[BaseException] | None, __exc_value: BaseException | None, __traceback: TracebackType | None) -> bool | None:
+        self.close()
+        return None
+
+    def write(self, time: int):
+        self.__file.write(_TIMESTAMP.pack(time))
+
+    def close(self):
+        self.__file.close()
+
+
+def read_timestamps(path: str) -> np.ndarray:
+    """
+    `TimestampWriter`で書き込んだ取得時刻を読み込む
+
+    Returns:
+        np.ndarray: フレームごとの取得時刻（ns、`int64`）
+    """
+    with open(path, "rb") as f:
+        magic, version = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a timestamps file")
+        return np.fromfile(f, dtype="<i8")
+
+
+def write_timecodes(timestamps: np.ndarray, path: str):
+    """
+    mkvmergeのtimestamp format v2（ミリ秒のテキスト）に変換する
+
+    `mkvmerge -o output.mkv --timestamps 0:timecodes.txt input.mp4`で、再エンコードせずに正しい再生速度の動画を作成できる。
+    フレームがない場合は、ヘッダーだけを書き込む。
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    with open(path, "w") as f:
+        f.write("# timestamp format v2\n")
+        if len(timestamps) == 0:
+            return
+        for ms in ((timestamps - timestamps[0]) / 1e6).tolist():
+            f.write(f"{ms:.3f}\n")
+
+
+def cfr_indices(timestamps: np.ndarray, fps: float) -> np.ndarray:
+    """
+    一定のフレームレートの各フレームに使用する、入力のフレームの番号を求める
+
+    各フレームには、その時刻までに取得した最新のフレームを使用する（取得が遅れた区間は直前のフレームを繰り返す）。
+
+    Args:
+        timestamps (np.ndarray): 入力のフレームごとの取得時刻（ns、昇順）
+        fps (float): 出力のフレームレート
+
+    Returns:
+        np.ndarray: 出力のフレームごとの入力のフレームの番号（入力がない場合は空）
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=np.int64)
+    elapsed = (timestamps - timestamps[0]) / 1e9
+    count = int(elapsed[-1] * fps) + 1
+    return np.searchsorted(elapsed, np.arange(count) / fps, side="right") - 1
+
+
+def restore_cfr(video: str, output: str, fps: Optional[float] = None, timestamps: Optional[str] = None) -> int:
+    """
+    可変フレームレートで録画した動画を、一定のフレームレートの動画に変換する（`cfr_indices`）
+
+    Args:
+        video (str): `Recorder(vfr=True)`で録画した動画
+        output (str): 出力する動画（mp4）
+        fps (Optional[float], optional): 出力のフレームレート。Defaults to None（録画時の設定）.
+        timestamps (Optional[str], optional): タイムスタンプのファイル。Defaults to None（`video`に`SUFFIX`を付けたもの）.
+
+    Returns:
+        int: 書き込んだフレーム数
+    """
+    times = read_timestamps(timestamps_path(
+        video) if timestamps is None else timestamps)
+    if len(times) == 0:
+        raise ValueError("no frames recorded")
+
+    capture = cv2.VideoCapture(video)
+    if not capture.isOpened():
+        raise RuntimeError(f"failed to open {video}")
+    try:
+        if fps is None:
+            fps = capture.get(cv2.CAP_PROP_FPS)
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        _, ext = path.splitext(output)
+        if ext != ".mp4":
+            raise ValueError("currently only mp4 is supported")
+        writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(
+            *"mp4v"), fps, (width, height))
+        try:
+            written = 0
+            index = -1
+            frame = None
+            for source in cfr_indices(times, fps).tolist():
+                while index < source:
+                    ret, frame = capture.read()
+                    if not ret:
+                        return written
+                    index += 1
+                writer.write(frame)
+                written += 1
+            return written
+        finally:
+            writer.release()
+    finally:
+        capture.release()
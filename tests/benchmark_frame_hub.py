@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from threading import Event, Thread
+from time import perf_counter, sleep
+
+import numpy as np
+
+from benchmark_recorder import FakeCapture, FPS
+from pokecon_extensions import FrameHub
+
+#
+# 録画とプレビューのように、2つの利用者が同じカメラから読み出した場合に、それぞれが受け取ったフレーム数を比較する
+#
+# directは、両者が同じVideoCaptureのreadを呼び出す変更前の使い方（フレームを奪い合う）。
+#
+
+SECONDS = 3
+
+
+def consume(capture, received: list, handle: Event):
+    frames = set()
+    while not handle.is_set():
+        ret, image = capture.read()
+        if not ret:
+            break
+        frames.add(int(image[0, 0, 0]) | int(image[0, 0, 1]) << 8)
+    received.append(len(frames))
+
+
+def run(name: str, captures: list):
+    handle = Event()
+    received: list[int] = []
+    threads = [Thread(target=consume, args=(capture, received, handle))
+               for capture in captures]
+    for thread in threads:
+        thread.start()
+    sleep(SECONDS)
+    handle.set()
+    for thread in threads:
+        thread.join()
+    print(f"{name:>8} {received[0]:>10} {received[1]:>10} {FPS * SECONDS:>8}")
+
+
+if __name__ == "__main__":
+
+    print(f"{'capture':>8} {'consumer1':>10} {'consumer2':>10} {'expected':>8}")
+
+    capture = FakeCapture()
+    run("direct", [capture, capture])
+
+    handle = Event()
+    hub = FrameHub(FakeCapture(), handle=handle)
+    hub.start()
+    run("hub", [hub.reader(), hub.reader(copy=False)])
+    handle.set()
+    hub.join()
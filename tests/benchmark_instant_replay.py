@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from threading import Event
+from time import perf_counter, process_time, sleep
+
+import cv2
+import numpy as np
+
+from benchmark_recorder import FakeCapture, FPS, HEIGHT, WIDTH
+from pokecon_extensions.recorder import InstantReplayRecorder, Recorder
+
+#
+# 待機中（トリガーがセットされるまで）のCPU時間とメモリ使用量、トリガー後に保存した動画のフレーム数を比較する
+#
+# recorderは、すべてを録画する変更前の使い方。
+#
+
+SECONDS = 5
+PRE_ROLL = 3
+POST_ROLL = 1
+
+
+def screen() -> np.ndarray:
+    """
+    ゲーム画面に近い（JPEGで圧縮しやすい）フレーム
+    """
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    frame[...] = np.linspace(0, 255, WIDTH, dtype=np.uint8)[None, :, None]
+    cv2.rectangle(frame, (100, 500), (1180, 680), (40, 40, 40), -1)
+    cv2.putText(frame, "A wild POKEMON appeared!", (140, 610),
+                cv2.FONT_HERSHEY_SIMPLEX, 2.0, (255, 255, 255), 3, cv2.LINE_AA)
+    cv2.circle(frame, (900, 250), 120, (0, 200, 255), -1)
+    return frame
+
+
+def recorder(directory: str):
+    handle = Event()
+    recorder = Recorder(FakeCapture(screen()), FPS, os.path.join(
+        directory, "recorder.mp4"), [], handle)
+    start = process_time()
+    recorder.start()
+    sleep(SECONDS)
+    cpu = process_time() - start
+    handle.set()
+    recorder.join()
+    return cpu, 0, "-"
+
+
+def instant_replay(directory: str, quality: int | None):
+    handle = Event()
+    trigger = Event()
+    replay = InstantReplayRecorder(FakeCapture(screen()), FPS, trigger, PRE_ROLL, POST_ROLL,
+                                   os.path.join(directory, str(quality)), quality=quality, handle=handle)
+    start = process_time()
+    replay.start()
+    sleep(SECONDS)
+    cpu = process_time() - start
+    buffered = replay.buffered
+
+    trigger.set()
+    start_time = perf_counter()
+    while len(replay.saved) == 0 and perf_counter() < start_time + POST_ROLL + 10:
+        sleep(0.1)
+    handle.set()
+    replay.join()
+
+    capture = cv2.VideoCapture(replay.saved[0])
+    frames = 0
+    while capture.read()[0]:
+        frames += 1
+    capture.release()
+    return cpu, buffered, frames
+
+
+if __name__ == "__main__":
+
+    directory = tempfile.mkdtemp()
+
+    print(
+        f"{'mode':>10} {'cpu [s]':>8} {'buffered [MB]':>13} {'clip frames':>11} {'expected':>8}")
+    for name, run in [("recorder", lambda: recorder(directory)),
+                      ("raw", lambda: instant_replay(directory, None)),
+                      ("jpeg", lambda: instant_replay(directory, 90))]:
+        cpu, buffered, frames = run()
+        print(
+            f"{name:>10} {cpu:>8.2f} {buffered / 1e6:>13.1f} {frames:>11} {(PRE_ROLL + POST_ROLL) * FPS:>8}")
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import math
+import os
+import tempfile
+from threading import Event, Lock
+from time import perf_counter, sleep
+
+import cv2
+import numpy as np
+
+from pokecon_extensions.recorder import Backpressure, Recorder
+
+#
+# 一定の間隔でフレームを返す疑似的なカメラと重いフィルターを使用し、フレーム落ちの数を比較する
+#
+# legacyは、取得、フィルター、書き込みを1つのスレッドで順に実行する変更前の処理。
+#
+
+FPS = 30
+SECONDS = 5
+WIDTH, HEIGHT = 1280, 720
+
+
+class FakeCapture:
+    """
+    `FPS`の間隔でフレームを返す`cv2.VideoCapture`の代わり
+    """
+
+    def __init__(self, frame: np.ndarray | None = None) -> None:
+        """
+        Args:
+            frame (np.ndarray | None, optional): 返すフレーム。Defaults to None（ノイズ）.
+        """
+        self.__start_time = perf_counter()
+        self.__count = 0
+        self.__lock = Lock()
+        self.__frame = np.random.default_rng(0).integers(
+            0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8) if frame is None else frame
+
+    def isOpened(self) -> bool:
+        return True
+
+    def get(self, prop: int) -> float:
+        return {cv2.CAP_PROP_FRAME_WIDTH: WIDTH, cv2.CAP_PROP_FRAME_HEIGHT: HEIGHT}[prop]
+
+    def read(self, image: np.ndarray | None = None):
+        # VideoCaptureと同じく、複数のスレッドからの呼び出しは1つずつ処理する
+        with self.__lock:
+            # 次のフレームが届くまで待機する（取得が遅れた分のフレームは失われる）
+            now = perf_counter() - self.__start_time
+            self.__count = max(self.__count + 1, math.ceil(now * FPS))
+            left = self.__count / FPS - now
+            if 0 < left:
+                sleep(left)
+
+            if image is None or image.shape != self.__frame.shape:
+                image = np.empty_like(self.__frame)
+            image[...] = self.__frame
+            # 左上の画素にフレームの番号を埋め込む
+            image[0, 0, :2] = self.__count & 0xFF, self.__count >> 8 & 0xFF
+            return True, image
+
+
+def blur(frame: np.ndarray):
+    return cv2.GaussianBlur(frame, (31, 31), 0)
+
+
+def legacy(filename: str) -> int:
+    capture = FakeCapture()
+    writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(
+        *"mp4v"), FPS, (WIDTH, HEIGHT))
+    interval = 1 / FPS
+    start_time = perf_counter()
+    write_count = 0
+    drop_count = 0
+    while perf_counter() < start_time + SECONDS:
+        _, frame = capture.read()
+        diff = perf_counter() - start_time - write_count * interval
+        if diff < 0:
+            continue
+        increase = math.ceil(diff / interval)
+        drop_count += max(0, increase - 1)
+        for _ in range(increase):
+            _frame = frame.copy()
+            _frame = blur(_frame.copy())
+            writer.write(_frame)
+        write_count += increase
+    writer.release()
+    return drop_count
+
+
+def pipelined(filename: str, backpressure: Backpressure) -> int:
+    handle = Event()
+    recorder = Recorder(FakeCapture(), FPS, filename, [blur], handle,
+                        backpressure=backpressure)
+    recorder.start()
+    sleep(SECONDS)
+    handle.set()
+    recorder.join()
+    return recorder.drop_count
+
+
+if __name__ == "__main__":
+
+    directory = tempfile.mkdtemp()
+
+    print(f"{'recorder':>24} {'drop_count':>10} {'expected':>8}")
+    print(f"{'legacy':>24} {legacy(os.path.join(directory, 'legacy.mp4')):>10} {FPS * SECONDS:>8}")
+    for backpressure in Backpressure:
+        drop_count = pipelined(os.path.join(
+            directory, f"{backpressure.name}.mp4"), backpressure)
+        print(f"{backpressure.name:>24} {drop_count:>10} {FPS * SECONDS:>8}")
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+from datetime import datetime
+from time import perf_counter
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from pokecon_extensions.recorder import apply_filters, inplace
+
+#
+# 取得が遅れて3フレーム分を書き込む場合の、取得した1フレームあたりのフィルター処理の時間とメモリ確保量を比較する
+#
+# legacyは、書き込むフレームごとにコピーしてすべてのフィルターを適用する変更前の処理（inplaceの宣言は無視される）。
+# allocatedは、処理中に確保されたメモリのピーク（numpyの配列はtracemallocで追跡される）。
+#
+
+WIDTH, HEIGHT = 1280, 720
+COUNT = 3
+NUMBER = 100
+
+
+@inplace
+def current_time(frame: cv2.Mat):
+    cv2.putText(frame, str(datetime.now()), (100, 100),
+                cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 3, cv2.LINE_AA)
+    return frame
+
+
+@inplace
+def grid(frame: cv2.Mat):
+    frame[::40, :] = 255
+    frame[:, ::40] = 255
+    return frame
+
+
+def legacy(frame: np.ndarray, filters: list) -> list:
+    written = []
+    for _ in range(COUNT):
+        _frame = frame.copy()
+        for filter in filters:
+            _frame = filter(_frame.copy())
+        written.append(_frame)
+    return written
+
+
+def filter_once(frame: np.ndarray, filters: list) -> list:
+    return [apply_filters(frame, filters)] * COUNT
+
+
+def measure(func, filters: list):
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+    tracemalloc.start()
+    peak = 0
+    start_time = perf_counter()
+    for _ in range(NUMBER):
+        source = frame.copy()  # 取得した新しいフレーム
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        func(source, filters)
+        _, current_peak = tracemalloc.get_traced_memory()
+        peak = max(peak, current_peak - base)
+    elapsed = perf_counter() - start_time
+    tracemalloc.stop()
+    return elapsed / NUMBER, peak
+
+
+if __name__ == "__main__":
+
+    filters = [current_time, grid]
+    # inplaceを宣言していない場合は、フィルターごとにコピーする
+    undeclared = [lambda frame: current_time(frame), lambda frame: grid(frame)]
+
+    print(f"{'filter':>20} {'time/frame':>12} {'allocated':>12}")
+    for name, func, _filters in [("legacy", legacy, filters),
+                                 ("filter_once", filter_once, undeclared),
+                                 ("filter_once+inplace", filter_once, filters)]:
+        elapsed, peak = measure(func, _filters)
+        print(f"{name:>20} {elapsed * 1e3:>9.2f} ms {peak / 2 ** 20:>9.1f} MB")
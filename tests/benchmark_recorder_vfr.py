@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from threading import Event
+from time import process_time, sleep
+
+import cv2
+
+from benchmark_recorder import FakeCapture, FPS
+from pokecon_extensions.recorder import read_timestamps, Recorder, restore_cfr, write_timecodes
+
+#
+# カメラ（`FPS`）より高いfpsで録画した場合に、書き込んだフレーム数、CPU時間、ファイルサイズを比較する
+#
+# cfrは、取得が間に合わない分を直前のフレームで補う変更前の録画。
+# vfrは、取得したフレームを1回ずつ書き込み、取得時刻を記録する。restore_cfrで一定のフレームレートに戻した動画のフレーム数も確認する。
+#
+
+RECORDER_FPS = FPS * 2
+SECONDS = 5
+
+
+def record(filename: str, vfr: bool):
+    handle = Event()
+    recorder = Recorder(FakeCapture(), RECORDER_FPS, filename, [], handle,
+                        vfr=vfr)
+    start = process_time()
+    recorder.start()
+    sleep(SECONDS)
+    handle.set()
+    recorder.join()
+    return recorder.write_count, process_time() - start, os.path.getsize(filename)
+
+
+def count_frames(filename: str) -> int:
+    capture = cv2.VideoCapture(filename)
+    count = 0
+    while capture.read()[0]:
+        count += 1
+    capture.release()
+    return count
+
+
+if __name__ == "__main__":
+
+    directory = tempfile.mkdtemp()
+
+    print(f"{'mode':>8} {'write_count':>11} {'cpu [s]':>8} {'size [MB]':>9}")
+    for mode in ["cfr", "vfr"]:
+        filename = os.path.join(directory, f"{mode}.mp4")
+        write_count, cpu, size = record(filename, mode == "vfr")
+        print(f"{mode:>8} {write_count:>11} {cpu:>8.2f} {size / 1e6:>9.2f}")
+
+    filename = os.path.join(directory, "vfr.mp4")
+    timestamps = read_timestamps(filename + ".timestamps")
+    elapsed = (timestamps[-1] - timestamps[0]) / 1e9
+    write_timecodes(timestamps, os.path.join(directory, "timecodes.txt"))
+
+    restored = os.path.join(directory, "restored.mp4")
+    written = restore_cfr(filename, restored)
+    print()
+    print(f"timestamps: {len(timestamps)} frames in {elapsed:.3f} s")
+    print(
+        f"restored:   {written} frames ({count_frames(restored)} read back), expected {int(elapsed * RECORDER_FPS) + 1}")
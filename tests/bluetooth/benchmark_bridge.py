@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+import threading as th
+from time import perf_counter, process_time, sleep
+import tty
+from typing import List, Optional
+
+from pokecon_extensions.bluetooth import Adapter, Config, from_virtual_serial, ReadMode, SharedState, Transport
+from pokecon_extensions.bluetooth.btkeyLib import MockLibrary, use
+from pokecon_extensions.bluetooth.decorator.from_shared_state import from_shared_state
+
+#
+# 仮想シリアルポートの代わりにptyの組を使用し、btkeyLibのモックで受け取った時刻を記録する（*nixのみ）
+#
+# 各行の左スティックに通し番号を埋め込み、書き込んだ時刻とバックエンドが呼び出された時刻の差を遅延とする。
+# skippedは、間引きなどでバックエンドに届かなかった行数。
+#
+# sharedは、ptyの代わりに`SharedState`を経由した場合（すべての更新を順に読み出すため、coalesceは常にno）。
+#
+
+COUNT = 5000
+
+
+def encode(i: int) -> bytes:
+    return f"0x0002 8 {i >> 8 & 0xFF:x} {i & 0xFF:x}\r\n".encode()
+
+
+def decode(stick: tuple[int, int]) -> int:
+    x, y = stick
+    return (x >> 4) << 8 | (0xFFF - y) >> 4
+
+
+def percentile(values: List[float], p: float) -> float:
+    return sorted(values)[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(mode: Optional[ReadMode], coalesce: bool, rate: Optional[float]):
+    mock = MockLibrary()
+    use(mock)
+
+    is_paired, cancel = th.Event(), th.Event()
+    if mode is None:
+        doorbell = th.Event()
+        shared = SharedState(create=True, doorbell=doorbell)
+        adapter = Adapter(shared)
+        config = Config(transport=Transport.SharedMemory)
+        bridge = th.Thread(target=from_shared_state,
+                           args=(config, shared.name, doorbell, is_paired, cancel))
+
+        def write(data: bytes):
+            adapter.write(data)
+    else:
+        master, slave = os.openpty()
+        tty.setraw(master)
+        config = Config(port=os.ttyname(slave), baudrate=115200,
+                        read_mode=mode, coalesce=coalesce)
+        bridge = th.Thread(target=from_virtual_serial,
+                           args=(config, is_paired, cancel))
+
+        def write(data: bytes):
+            os.write(master, data)
+    bridge.start()
+    is_paired.wait()
+
+    # 待機中のCPU使用率
+    cpu = process_time()
+    sleep(1)
+    idle = process_time() - cpu
+
+    written = [0.0] * COUNT
+    cpu = process_time()
+    start_time = perf_counter()
+    for i in range(COUNT):
+        if not rate is None:
+            left = start_time + i / rate - perf_counter()
+            if 0 < left:
+                sleep(left)
+        written[i] = perf_counter()
+        write(encode(i))
+    sleep(0.5)  # 読み残しを待つ
+    cpu = process_time() - cpu
+
+    cancel.set()
+    bridge.join()
+    if mode is None:
+        shared.close()
+    else:
+        os.close(master)
+        os.close(slave)
+
+    # 接続直後に送信されるニュートラルの状態は除く
+    calls = [call for call in mock.calls if call.name ==
+             "send_state" and not call.args[1] is None and start_time <= call.time]
+    latencies = [call.time - written[decode(call.args[1])] for call in calls]
+    elapsed = calls[-1].time - start_time
+
+    print(f"{'shared' if mode is None else mode.name:>8} {'yes' if coalesce else 'no':>8} {'max' if rate is None else f'{rate:.0f}':>6} "
+          f"{COUNT / elapsed:>10,.0f} "
+          f"{percentile(latencies, 0.5) * 1e3:>7.3f} {percentile(latencies, 0.9) * 1e3:>7.3f} "
+          f"{percentile(latencies, 0.99) * 1e3:>7.3f} {max(latencies) * 1e3:>7.3f} "
+          f"{cpu / (perf_counter() - start_time) * 100:>5.0f}% {idle * 100:>5.0f}% "
+          f"{COUNT - len(calls):>8}")
+
+
+if __name__ == "__main__":
+
+    print(f"{'mode':>8} {'coalesce':>8} {'rate':>6} {'lines/s':>10} "
+          f"{'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} {'max ms':>7} "
+          f"{'cpu':>6} {'idle':>6} {'skipped':>8}")
+
+    for mode in [ReadMode.Poll, ReadMode.Blocking, ReadMode.Select]:
+        for coalesce in [False, True]:
+            for rate in [1000, None]:
+                run(mode, coalesce, rate)
+    for rate in [1000, None]:
+        run(None, False, rate)
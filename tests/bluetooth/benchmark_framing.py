@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+import threading as th
+from time import perf_counter
+import tty
+
+from serial import Serial
+
+from pokecon_extensions.bluetooth.decorator.reader import ReadMode, read_batches
+
+#
+# 仮想シリアルポートの代わりにptyの組を使用する（*nixのみ）
+#
+
+LINE = b"0x0003 8 80 80 80 80\r\n"
+COUNT = 100000
+
+
+def write(fd: int):
+    data = LINE * 64
+    for _ in range(COUNT // 64):
+        os.write(fd, data)
+
+
+def readline(ser: Serial) -> int:
+    count = 0
+    while count < COUNT // 64 * 64:
+        if ser.readline() != b"":
+            count += 1
+    return count
+
+
+def batches(ser: Serial) -> int:
+    count = 0
+    cancel = th.Event()
+    for lines in read_batches(ser, ReadMode.Blocking, cancel):
+        count += len(lines)
+        if COUNT // 64 * 64 <= count:
+            cancel.set()
+    return count
+
+
+if __name__ == "__main__":
+
+    for name, read in [("readline", readline), ("read_batches", batches)]:
+        master, slave = os.openpty()
+        tty.setraw(master)
+        with Serial(os.ttyname(slave), 115200, timeout=0.1) as ser:
+            writer = th.Thread(target=write, args=(master,))
+
+            start = perf_counter()
+            writer.start()
+            count = read(ser)
+            elapsed = perf_counter() - start
+            writer.join()
+
+            print(f"{name:>12}: {count / elapsed:,.0f} lines/s")
+
+        os.close(master)
+        os.close(slave)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from timeit import timeit
+from typing import Optional
+
+from pydantic import BaseModel, validator
+
+from pokecon_extensions.bluetooth.state import Button, State, Stick, Sticks, decode
+
+#
+# 変更前のpydanticのモデルと、__slots__を使用したモデルの構築にかかる時間を比較する
+#
+
+
+class PydanticStick(BaseModel):
+    x: int
+    y: int
+
+    @validator("x")
+    def x_axis_must_be_between_0_255(cls, axis: int):
+        assert 0x0 <= axis and axis <= 0xff
+        return int(axis / 0x100 * 0x1000)
+
+    @validator("y")
+    def y_axis_must_be_between_0_255(cls, axis: int):
+        assert 0x0 <= axis and axis <= 0xff
+        return 0xFFF - int(axis / 0x100 * 0x1000)
+
+
+class PydanticSticks(BaseModel):
+    l: Optional[PydanticStick] = None
+    r: Optional[PydanticStick] = None
+
+
+class PydanticState(BaseModel):
+    buttons: Button = Button(0)
+    sticks: PydanticSticks = PydanticSticks(
+        l=PydanticStick(x=128, y=128), r=PydanticStick(x=128, y=128))
+
+
+if __name__ == "__main__":
+
+    number = 20000
+
+    # 変換結果が一致することを確認する
+    for x in range(0x100):
+        stick, legacy = Stick(x=x, y=x), PydanticStick(x=x, y=x)
+        assert (stick.x, stick.y) == (legacy.x, legacy.y)
+
+    cases = [
+        ("Stick", lambda: PydanticStick(x=0x80, y=0xFF),
+         lambda: Stick(x=0x80, y=0xFF)),
+        ("State", lambda: PydanticState(buttons=Button.A, sticks=PydanticSticks(l=PydanticStick(x=0x80, y=0xFF), r=None)),
+         lambda: State(buttons=Button.A, sticks=Sticks(l=Stick(x=0x80, y=0xFF), r=None))),
+        ("State.from_raw", lambda: PydanticState(buttons=Button(raw.buttons), sticks=PydanticSticks(
+            l=PydanticStick.construct(x=raw.l[0], y=raw.l[1]), r=None)),
+         lambda: State.from_raw(raw)),
+    ]
+    raw = decode(b"0x0012 2 ff 0\r\n")
+
+    print(f"{'model':>16} {'pydantic':>12} {'slots':>12}")
+    for name, before, after in cases:
+        elapsed = [timeit(func, number=number) / number
+                   for func in (before, after)]
+        print(f"{name:>16} {elapsed[0] * 1e6:>9.2f} us {elapsed[1] * 1e6:>9.2f} us")
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import os
+from time import perf_counter, sleep
+import tty
+from typing import Callable, List
+
+# 子プロセスではbtkeyLibのモックを使用する
+os.environ["POKECON_BTKEYLIB"] = "mock"
+
+from pokecon_extensions.bluetooth import Config, Multiplexer, ReadMode  # nopep8
+from pokecon_extensions.bluetooth.decorator.bridge import Bridge  # nopep8
+
+#
+# 仮想シリアルポートの代わりにptyの組を使用し、コンソールごとにBridgeを起動した場合とMultiplexerを使用した場合のCPU時間を比較する（*nixのみ）
+#
+# cpuは、このプロセスと子プロセスのCPU時間の合計を、経過時間とコンソール数で割ったもの。
+# Multiplexerはread_modeを使用しない（*nixでは常にselectorsで監視する）。
+# Multiplexerは管理と統計値のための機能で、CPU時間はBlockingのBridgeよりやや多い（8コンソールで3.0%に対して3.8-4.1%）。
+#
+
+CONSOLES = 8
+RATE = 500
+SECONDS = 3
+
+
+def cpu_time() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def drive(masters: List[int]):
+    # 各ポートに一定の間隔で書き込む
+    start_time = perf_counter()
+    for i in range(RATE * SECONDS):
+        left = start_time + i / RATE - perf_counter()
+        if 0 < left:
+            sleep(left)
+        line = f"0x{1 << (i % 14) if i % 2 == 0 else 0:04x} 8 80 80\r\n".encode()
+        for master in masters:
+            os.write(master, line)
+    sleep(0.2)
+
+
+def run(name: str, mode: ReadMode, start: Callable[[List[Config]], Callable[[], None]]):
+    ptys = [os.openpty() for _ in range(CONSOLES)]
+    for master, _ in ptys:
+        tty.setraw(master)
+    configs = [Config(port=os.ttyname(slave), baudrate=115200, read_mode=mode)
+               for _, slave in ptys]
+
+    cpu = cpu_time()
+    start_time = perf_counter()
+    stop = start(configs)
+    drive([master for master, _ in ptys])
+    stop()
+    cpu = cpu_time() - cpu
+    elapsed = perf_counter() - start_time
+
+    for master, slave in ptys:
+        os.close(master)
+        os.close(slave)
+
+    print(f"{name:>12} {mode.name:>8} {CONSOLES:>8} {cpu / elapsed / CONSOLES * 100:>8.1f}%")
+
+
+def bridges(configs: List[Config]):
+    started = [Bridge(config) for config in configs]
+    for bridge in started:
+        bridge.wait_for_pairing()
+
+    def stop():
+        for bridge in started:
+            bridge.close()
+    return stop
+
+
+def multiplexer(configs: List[Config]):
+    mux = Multiplexer(configs)
+    mux.start()
+    mux.wait_for_pairing()
+
+    def stop():
+        for m in mux.metrics():
+            print(f"{m.port:>12} lines {m.lines:>6} dispatched {m.dispatched:>6} errors {m.errors:>3} "
+                  f"latency mean {m.latency_mean * 1e3:.3f} ms, max {m.latency_max * 1e3:.3f} ms")
+        mux.close()
+    return stop
+
+
+if __name__ == "__main__":
+
+    print(f"{'bridge':>12} {'mode':>8} {'consoles':>8} {'cpu':>9}")
+    run("Bridge", ReadMode.Poll, bridges)
+    run("Bridge", ReadMode.Blocking, bridges)
+    run("Multiplexer", ReadMode.Select, multiplexer)
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import subprocess
+import tempfile
+from timeit import timeit
+
+#
+# スタブの共有ライブラリをビルドして、項目ごとの呼び出しとsend_stateを比較する（*nixのみ）
+#
+
+STUB = Path(__file__).parent.joinpath("stub", "btkeyLib.c")
+
+if __name__ == "__main__":
+
+    with tempfile.TemporaryDirectory() as dir:
+        path = os.path.join(dir, "libbtkeyLib_stub.so")
+        subprocess.run(["cc", "-shared", "-fPIC", "-O2", "-o",
+                       path, str(STUB)], check=True)
+        os.environ["POKECON_BTKEYLIB"] = path
+
+        from pokecon_extensions.bluetooth.btkeyLib import Library
+
+        library = Library(path)
+        dll = library.dll
+        assert library.supports_send_state
+
+        def per_field():
+            dll.send_button(0x8, 0)
+            dll.send_stick_l(0x800, 0x7FF, 0)
+            dll.send_stick_r(0x800, 0x7FF, 0)
+            dll.send_gyro(1, 2, 3)
+            dll.send_accel(4, 5, 6)
+
+        def batched():
+            library.send_state(0x8, (0x800, 0x7FF),
+                               (0x800, 0x7FF), (1, 2, 3), (4, 5, 6))
+
+        number = 100000
+        for name, func in [("per field", per_field), ("send_state", batched)]:
+            elapsed = timeit(func, number=number)
+            print(f"{name:>10}: {elapsed / number * 1e6:.2f} us/report")
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from functools import reduce
+from timeit import timeit
+
+from benchmark_models import PydanticState, PydanticStick, PydanticSticks
+from pokecon_extensions.bluetooth.state import TABLE_BUTTON, TABLE_HAT, Button, State, decode
+
+LINES = [
+    b"end\r\n",
+    b"0x0010 8\r\n",
+    b"0x0003 8 80 80 80 80\r\n",
+    b"0x0012 2 ff 0\r\n",
+    b"0x4001 0 0 0 20 e0\r\n",
+]
+
+
+def legacy(data: bytes):
+    """
+    変更前と同等の処理（文字列への変換とpydanticのモデル構築）
+    """
+    line = data.decode("ascii").replace("\r\n", "").split(" ")
+    if line[0] == "end":
+        return PydanticState()
+    line.extend(["0"] * (6 - len(line)))
+    btns, hat, lx, ly, rx, ry = [int(val, 16) for val in line]
+    buttons = reduce(lambda a, b: a | b, [
+                     t[1] for t in TABLE_BUTTON.items() if btns & t[0]], Button(0)) | TABLE_HAT[hat]
+    return PydanticState(buttons=buttons,
+                         sticks=PydanticSticks(l=PydanticStick(x=lx, y=ly) if bool(btns & 0b10) else None,
+                                               r=PydanticStick(x=rx, y=ry) if bool(btns & 0b01) else None))
+
+
+if __name__ == "__main__":
+
+    number = 20000
+
+    for name, func in [("legacy", legacy), ("State.from_bytes", State.from_bytes), ("decode", decode)]:
+        elapsed = timeit(lambda: [func(line) for line in LINES], number=number)
+        per_line = elapsed / (number * len(LINES))
+        print(f"{name:>16}: {per_line * 1e6:.2f} us/line")
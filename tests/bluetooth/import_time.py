@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+#
+# PokeConのGUIプロセスと同様に、pokecon_extensions.bluetoothをimportしたときの所要時間と読み込まれるモジュールを確認する
+#
+
+CODE = """
+import sys
+import pokecon_extensions.bluetooth
+from pokecon_extensions.bluetooth.btkeyLib import btkeyLib
+print("btkeyLib loaded:", not btkeyLib.__backend__ is None)
+print("numpy imported:", "numpy" in sys.modules)
+print("cv2 imported:", "cv2" in sys.modules)
+"""
+
+if __name__ == "__main__":
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CODE],
+                            capture_output=True, text=True, check=True)
+    print(result.stdout, end="")
+
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        _, cumulative, name = line.split("|")
+        if name.strip() == "pokecon_extensions.bluetooth":
+            print(f"import time: {int(cumulative) / 1000:.1f} ms")
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from Commands.Keys import Button
+from Commands.PythonCommandBase import ImageProcPythonCommand
+
+from pokecon_extensions.bluetooth import bluetooth, Config, Transport
+
+
+class BluetoothInProcessTest(ImageProcPythonCommand):
+
+    NAME = "Bluetooth自動化のテスト（仮想シリアルポートなし）"
+
+    def __init__(self, cam):
+        super().__init__(cam)
+
+    @bluetooth(Config(transport=Transport.InProcess, persistent=True))
+    def do(self):
+        self.press(Button.A, 1, 1)
+        self.press(Button.A, 1, 1)
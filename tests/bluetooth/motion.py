@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import numpy as np
+
+from pokecon_extensions.bluetooth import motion_samples, MotionStream, Session
+
+if __name__ == "__main__":
+
+    # 200Hzで10秒間、ジャイロのx軸を正弦波で揺らす
+    t = np.arange(2000) / 200
+    gyro = np.zeros((len(t), 3))
+    gyro[:, 0] = np.sin(2 * np.pi * t) * 0x1000
+    accel = np.zeros((len(t), 3))
+
+    with Session() as session:
+        stream = MotionStream(session, motion_samples(t, gyro, accel))
+        stream.start()
+        stream.join()
+        print(f"sent: {stream.sent}, dropped: {stream.dropped}")
@@ -0,0 +1,80 @@
+/*
+ * btkeyLibのスタブ
+ *
+ * Switchやドングルを使用せずにベンチマークを実行するため、btkeyLibと同じ関数を公開し、受け取った値を保持するだけの共有ライブラリ。
+ * 入力状態をまとめて受け取る`send_state`も実装している。
+ *
+ *     cc -shared -fPIC -O2 -o libbtkeyLib_stub.so btkeyLib.c
+ */
+
+#include <stdbool.h>
+#include <stdint.h>
+
+#define REPORT_BUTTONS 0x01
+#define REPORT_STICK_L 0x02
+#define REPORT_STICK_R 0x04
+#define REPORT_GYRO 0x08
+#define REPORT_ACCEL 0x10
+
+typedef struct
+{
+    uint32_t flags;
+    uint32_t buttons;
+    uint32_t stick_l[2];
+    uint32_t stick_r[2];
+    int16_t gyro[3];
+    int16_t accel[3];
+} report_t;
+
+static volatile report_t current;
+static volatile bool started;
+
+void send_button(uint32_t key, uint32_t unused) { current.buttons = key; }
+
+void send_stick_l(uint32_t h, uint32_t v, uint32_t unused)
+{
+    current.stick_l[0] = h;
+    current.stick_l[1] = v;
+}
+
+void send_stick_r(uint32_t h, uint32_t v, uint32_t unused)
+{
+    current.stick_r[0] = h;
+    current.stick_r[1] = v;
+}
+
+void send_gyro(int16_t x, int16_t y, int16_t z)
+{
+    current.gyro[0] = x;
+    current.gyro[1] = y;
+    current.gyro[2] = z;
+}
+
+void send_accel(int16_t x, int16_t y, int16_t z)
+{
+    current.accel[0] = x;
+    current.accel[1] = y;
+    current.accel[2] = z;
+}
+
+void send_state(const report_t *report)
+{
+    if (report->flags & REPORT_BUTTONS)
+        send_button(report->buttons, 0);
+    if (report->flags & REPORT_STICK_L)
+        send_stick_l(report->stick_l[0], report->stick_l[1], 0);
+    if (report->flags & REPORT_STICK_R)
+        send_stick_r(report->stick_r[0], report->stick_r[1], 0);
+    if (report->flags & REPORT_GYRO)
+        send_gyro(report->gyro[0], report->gyro[1], report->gyro[2]);
+    if (report->flags & REPORT_ACCEL)
+        send_accel(report->accel[0], report->accel[1], report->accel[2]);
+}
+
+void send_padcolor(uint32_t pad, uint32_t button, uint32_t leftgrip, uint32_t rightgrip) {}
+
+void start_gamepad(void) { started = true; }
+
+bool gamepad_paired(void) { return started; }
+
+void shutdown_gamepad(void) { started = false; }
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from time import perf_counter, sleep
+
+from pokecon_extensions.bluetooth import read_trace, replay, Session, TraceBuffer, TraceWriter
+from pokecon_extensions.bluetooth.btkeyLib import MockLibrary, use
+from pokecon_extensions.bluetooth.state import NEUTRAL, RawState
+
+#
+# btkeyLibのモックを使用し、記録した入力を再生して送信間隔のずれを確認する
+#
+
+if __name__ == "__main__":
+
+    use(MockLibrary())
+
+    path = os.path.join(tempfile.mkdtemp(), "trace.bin")
+
+    # 不規則な間隔でボタンを押して離す
+    with TraceWriter(path) as writer, Session(trace=writer) as session:
+        for i in range(100):
+            session.dispatch(RawState(1 << (i % 14), None, None))
+            sleep(0.005 + (i % 7) * 0.001)
+            session.dispatch(NEUTRAL)
+            sleep(0.003)
+
+    records = read_trace(path)
+    print(f"recorded: {len(records)}, {os.path.getsize(path)} bytes")
+
+    buffer = TraceBuffer(capacity=len(records))
+    with Session(trace=buffer) as session:
+        # 送信用のスレッドが起動するまでの時間を空けて開始する
+        end = replay(records, session, at=perf_counter() + 0.05)
+        sleep(max(0, end - perf_counter()) + 0.1)
+
+    replayed = buffer.records()
+    assert [r.state for r in replayed] == [r.state for r in records]
+
+    errors = [abs((b.time - replayed[0].time) - (a.time - records[0].time)) / 1e3
+              for a, b in zip(records, replayed)]
+    print(f"timing error: mean {sum(errors) / len(errors):.1f} us, max {max(errors):.1f} us")
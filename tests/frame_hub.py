@@ -0,0 +1,42 @@
+from os import path
+from threading import Event
+from time import perf_counter, sleep
+
+from Commands.PythonCommandBase import ImageProcPythonCommand
+
+from pokecon_extensions import FrameHub, HeartbeatMonitor, Recorder
+
+
+class TestFrameHub(ImageProcPythonCommand):
+
+    NAME = 'FrameHubテスト'
+
+    def __init__(self, cam, gui=None):
+        super().__init__(cam, gui)
+
+    def do(self):
+
+        filename = path.join(path.dirname(__file__), "test_hub.mp4")
+        print(f"10秒間録画します: {filename}")
+
+        handle = Event()
+        HeartbeatMonitor(self, handle).start()
+
+        # カメラからの取得はFrameHubだけがおこない、録画とプレビューはFrameHubのフレームを参照します。
+        hub = FrameHub(self.camera.camera, handle=handle)
+        hub.start()
+
+        with hub.share(self.camera):
+            recorder = Recorder(hub, self.camera.fps, filename, handle=handle)
+            recorder.start()
+
+            start_time = perf_counter()
+            while perf_counter() < start_time + 10:
+                sleep(0.5)
+                self.checkIfAlive()
+
+            handle.set()
+            recorder.join()
+        hub.join()
+
+        print(f"録画は正常に終了しました。")
@@ -0,0 +1,45 @@
+from os import path
+from threading import Event
+from time import perf_counter, sleep
+
+from Commands.PythonCommandBase import ImageProcPythonCommand
+
+from pokecon_extensions import HeartbeatMonitor, InstantReplayRecorder
+
+
+class TestInstantReplay(ImageProcPythonCommand):
+
+    NAME = 'インスタントリプレイテスト'
+
+    def __init__(self, cam, gui=None):
+        super().__init__(cam, gui)
+
+    def do(self):
+
+        directory = path.dirname(__file__)
+        print(f"20秒後に、直前の10秒と直後の3秒を保存します: {directory}")
+
+        handle = Event()
+        HeartbeatMonitor(self, handle).start()
+
+        # 普段はメモリに保持するだけで、triggerをsetしたときだけmp4に書き込みます。
+        # 色違いを見つけた場合など、残したい場面でsetしてください（スレッドセーフです）。
+        trigger = Event()
+        replay = InstantReplayRecorder(
+            self.camera.camera, self.camera.fps, trigger, pre_roll=10, post_roll=3, directory=directory, handle=handle)
+        replay.start()
+
+        start_time = perf_counter()
+        while perf_counter() < start_time + 20:
+            sleep(0.5)
+            self.checkIfAlive()
+        trigger.set()
+
+        while len(replay.saved) == 0:
+            sleep(0.5)
+            self.checkIfAlive()
+
+        handle.set()
+        replay.join()
+
+        print(f"保存しました: {replay.saved[0]}")
@@ -8,11 +8,14 @@ import numpy as np
 
 from Commands.PythonCommandBase import ImageProcPythonCommand
 
-from pokecon_extensions import HeartbeatMonitor, Recorder
+from pokecon_extensions import HeartbeatMonitor, inplace, Recorder
 
 
+@inplace
 def current_time(frame: cv2.Mat):
     """現在時刻を表記するフィルター
+
+    入力を直接書き換えるため、`inplace`を宣言してコピーを省略します。
     """
     cv2.putText(frame, str(datetime.now()), (100, 100),
                 cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 3, cv2.LINE_AA)